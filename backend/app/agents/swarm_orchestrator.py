@@ -15,14 +15,17 @@ from app.config import settings
 from app.tools.places_tool import PlacesService
 from app.tools.distance_tool import DistanceService
 from app.telephony.call_manager import trigger_outbound_call, get_call_number, get_conversation_details
-from app.scoring.ranker import rank_results
+from app.scoring.ranker import rank_results, build_feature_matrix
+from app.scoring.group_planner import schedule_refresh
 from app import database as db
+from app.encoding import FrozenJSON, dumps_str
 
 logger = logging.getLogger(__name__)
 
 # In-memory stores
 campaign_groups: dict = {}
 conversation_map: dict = {}  # conversation_id → {group_id, campaign_id, provider_id}
+score_features: dict = {}  # campaign_id → cached score feature matrix for what-if re-ranking
 
 places = PlacesService()
 distances = DistanceService()
@@ -52,6 +55,7 @@ class CampaignManager:
             "status": "running",
             "campaigns": [],
             "created_at": datetime.utcnow().isoformat(),
+            "results_version": 0,  # Bumped whenever an outcome changes; keys the optimizer cache
         }
 
         for svc in service_types:
@@ -132,6 +136,7 @@ class CampaignManager:
 
             if not providers:
                 campaign["status"] = "no_providers"
+                CampaignManager.bump_results_version(group_id)
                 await _broadcast(group_id, {
                     "type": "campaign_status", "campaign_id": cid,
                     "status": "no_providers", "message": f"No {svc} providers found."
@@ -228,6 +233,11 @@ class CampaignManager:
                 campaign["results"], campaign["providers"],
                 campaign["preferences"], pref_name_list, campaign["max_distance"]
             )
+            score_features[cid] = build_feature_matrix(
+                campaign["results"], campaign["providers"], pref_name_list, campaign["max_distance"]
+            )
+
+            CampaignManager.bump_results_version(group_id)
 
             booked = [r for r in campaign["results"] if r.get("status") == "booked"]
             if booked:
@@ -256,6 +266,7 @@ class CampaignManager:
         except Exception as e:
             logger.error(f"❌ Campaign {cid} error: {e}", exc_info=True)
             campaign["status"] = "error"
+            CampaignManager.bump_results_version(group_id)
 
             # 💾 Update campaign status in DB
             try:
@@ -298,12 +309,15 @@ class CampaignManager:
                 logger.error(f"Disconnect error: {e}")
             
             # Update status in memory immediately
+            from app.tools.holds import slot_holds
             group = CampaignManager.get_group(group_id)
             if group:
                 for camp in group["campaigns"]:
                     for r in camp["results"]:
                         if r.get("provider_id") == provider_id:
                             r["status"] = "disconnected"
+                            slot_holds.release(group.get("user_id") or "default", (camp["campaign_id"], provider_id))
+                CampaignManager.bump_results_version(group_id)
 
             await _broadcast(group_id, {
                 "type": "call_disconnected",
@@ -356,11 +370,11 @@ class CampaignManager:
                 status = details.get("status", "")
                 if status in ["done", "ended", "failed"]:
                     # Send final full transcript
-                    all_formatted = [{
+                    all_formatted = FrozenJSON([{
                         "role": e.get("role", "unknown"),
                         "message": e.get("message", ""),
                         "time": e.get("time_in_call_secs", 0),
-                    } for e in transcript] if isinstance(transcript, list) else []
+                    } for e in transcript] if isinstance(transcript, list) else [])
                     
                     await _broadcast(group_id, {
                         "type": "transcript_final",
@@ -397,6 +411,7 @@ class CampaignManager:
         if not real_phone:
             logger.warning(f"⚠️ No phone for {name}, skipping")
             campaign["results"].append({"provider_id": pid, "provider_name": name, "status": "skipped", "reason": "No phone number"})
+            CampaignManager.bump_results_version(group_id)
             await _broadcast(group_id, {
                 "type": "call_skipped", "campaign_id": campaign_id,
                 "provider_id": pid, "provider_name": name, "reason": "No phone number"
@@ -415,6 +430,7 @@ class CampaignManager:
 
         # 🧠 Cross-Call Intelligence: inject current best offer
         current_best = CampaignManager._get_best_offer(campaign)
+        free_windows = await CampaignManager._get_free_windows(group_id, campaign_id, pid)
 
         dynamic_vars = {
             "campaign_id": campaign_id,
@@ -424,6 +440,7 @@ class CampaignManager:
             "preferred_date": campaign.get("preferred_date", "this week"),
             "agent_name": "Alex",
             "current_best_offer": current_best,
+            "free_windows": free_windows,
         }
 
         result = await trigger_outbound_call(call_number, dynamic_vars)
@@ -466,6 +483,7 @@ class CampaignManager:
                 "provider_id": pid, "provider_name": name,
                 "status": "failed", "error": result.get("error"),
             })
+            CampaignManager.bump_results_version(group_id)
 
             # 💾 Persist failed call to DB
             try:
@@ -512,6 +530,7 @@ class CampaignManager:
                             "provider_name": next((p["name"] for p in campaign["providers"] if p["provider_id"] == provider_id), ""),
                             "status": "completed", "conversation_id": conv_id,
                         })
+                        CampaignManager.bump_results_version(group_id)
                     # Fetch transcript
                     transcript = details.get("transcript", [])
                     formatted_transcript = []
@@ -523,6 +542,8 @@ class CampaignManager:
                                 "time": t.get("time_in_call_secs", 0),
                             })
 
+                    # Final — encoded once and reused by every broadcast/poll/DB write
+                    formatted_transcript = FrozenJSON(formatted_transcript)
                     if formatted_transcript:
                         await CampaignManager.update_provider_result(campaign_id, provider_id, {
                             "transcript": formatted_transcript,
@@ -539,6 +560,39 @@ class CampaignManager:
 
         if elapsed >= max_wait:
             campaign["results"].append({"provider_id": provider_id, "status": "timeout"})
+            CampaignManager.bump_results_version(group_id)
+
+        # Call is over — free its tentative slot hold unless it was confirmed
+        from app.tools.holds import slot_holds
+        group = CampaignManager.get_group(group_id)
+        if group:
+            slot_holds.release(group.get("user_id") or "default", (campaign_id, provider_id))
+
+    @staticmethod
+    async def _get_free_windows(group_id: str, campaign_id: str, provider_id: str) -> str:
+        """
+        User's free windows for the next few days (minus other calls' holds), so the agent
+        can steer toward workable slots. Also warms the free/busy cache check_calendar uses.
+        """
+        from app.routes.tools import get_user_calendar
+        from app.tools.freebusy import freebusy_cache, format_windows
+        from app.tools.holds import slot_holds
+        group = CampaignManager.get_group(group_id)
+        if not group:
+            return ""
+        user_id = group.get("user_id") or "default"
+        cal = await get_user_calendar(user_id)
+        if not cal:
+            return ""
+        try:
+            windows = await freebusy_cache.free_windows(
+                cal, user_id, settings.agent_free_window_days,
+                slot_holds.intervals(user_id, exclude=(campaign_id, provider_id)),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Free windows unavailable: {e}")
+            return ""
+        return format_windows(windows)
 
     @staticmethod
     def _get_best_offer(campaign: dict) -> str:
@@ -574,6 +628,19 @@ class CampaignManager:
     def get_group(group_id: str):
         return campaign_groups.get(group_id)
 
+    @staticmethod
+    def bump_results_version(group_id: str) -> int:
+        """
+        Mark the group's outcomes as changed so cached optimizer results are
+        recomputed, and queue an incremental re-plan for the live plan view.
+        """
+        group = campaign_groups.get(group_id)
+        if not group:
+            return 0
+        group["results_version"] = group.get("results_version", 0) + 1
+        schedule_refresh(group)
+        return group["results_version"]
+
     @staticmethod
     async def update_provider_result(campaign_id: str, provider_id: str, result_data: dict) -> Optional[str]:
         """Update the in-memory campaign state with analysis results, then persist to DB."""
@@ -581,11 +648,17 @@ class CampaignManager:
             for camp in group["campaigns"]:
                 if camp["campaign_id"] == campaign_id:
                     existing = next((r for r in camp["results"] if r.get("provider_id") == provider_id), None)
+                    outcome_changed = any(
+                        k in result_data and (existing or {}).get(k) != result_data[k]
+                        for k in ("status", "offered_slot", "score")
+                    )
                     if existing:
                         existing.update(result_data)
                     else:
                         res = {"provider_id": provider_id, **result_data}
                         camp["results"].append(res)
+                    if outcome_changed:
+                        CampaignManager.bump_results_version(gid)
 
                     # 💾 Update call in DB with results
                     try:
@@ -603,11 +676,11 @@ class CampaignManager:
                             }
                             slot = result_data.get("offered_slot", {})
                             if slot:
-                                update_data["offered_slot"] = json.dumps(slot) if isinstance(slot, dict) else str(slot)
+                                update_data["offered_slot"] = dumps_str(slot) if isinstance(slot, dict) else str(slot)
                             if result_data.get("score") is not None:
                                 update_data["score"] = result_data["score"]
                             if result_data.get("transcript"):
-                                update_data["transcript"] = json.dumps(result_data["transcript"])
+                                update_data["transcript"] = dumps_str(result_data["transcript"])
 
                             await db.update_call(db_call_id, update_data)
                             logger.info(f"💾 Call {db_call_id} updated in DB: {result_data.get('status')}")
@@ -23,6 +23,27 @@ class Settings(BaseSettings):
     google_oauth_client_id: str = ""
     google_oauth_client_secret: str = ""
     google_oauth_redirect_uri: str = "http://localhost:5173/auth/callback"
+    google_token_refresh_margin_seconds: int = 300  # Refresh access tokens this long before expiry
+    google_token_idle_seconds: int = 3600  # Stop background refreshes for users idle this long
+    calendar_timezone: str = "America/New_York"
+    calendar_max_workers: int = 8  # Threads for blocking Google Calendar calls
+    calendar_pool_size: int = 64  # Per-user calendar clients kept
+    calendar_pool_idle_seconds: int = 1800
+    freebusy_window_days: int = 14  # Days ahead loaded per free/busy cache fill
+    freebusy_ttl_seconds: int = 300
+    slot_hold_seconds: int = 300  # Tentative holds from check_calendar expire after this
+    slot_confirmed_hold_seconds: int = 1800  # Booked slots stay held this long while the calendar catches up
+    calendar_sync_batch_size: int = 20  # Events per Google batch request (API max 50)
+    calendar_sync_linger_ms: int = 250  # Wait this long for more bookings before sending a batch
+    calendar_sync_max_retries: int = 3
+    calendar_events_sync_seconds: int = 30  # Min interval between incremental syncs per user
+    calendar_events_past_days: int = 30  # History included in the initial full sync
+    calendar_events_future_days: int = 365  # Horizon of the full sync (bounds recurring-event expansion)
+
+    # -- Agent free windows --
+    agent_free_window_days: int = 5  # Days of free time passed to the agent before dialing
+    agent_day_start_hour: int = 9
+    agent_day_end_hour: int = 17
 
     # -- Auth --
     jwt_secret: str = ""
@@ -33,6 +54,20 @@ class Settings(BaseSettings):
     max_parallel_calls: int = 15
     call_timeout_seconds: int = 120
 
+    # -- WebSockets --
+    ws_send_queue_size: int = 256  # Messages buffered per client before it is dropped as a slow consumer
+    ws_batch_window_ms: int = 75  # Coalesce a room's events within this window into one frame (0 = off)
+    ws_replay_buffer_size: int = 500  # Recent events kept per room for reconnecting clients
+    ws_heartbeat_seconds: int = 20  # Ping interval (0 = off)
+    ws_heartbeat_timeout_seconds: int = 60  # Close clients that sent nothing for this long
+    ws_pubsub_url: str = ""  # redis:// URL to fan out across uvicorn workers (empty = in-process)
+    ws_pubsub_channel: str = "callpilot:ws"
+
+    # -- Optimizer --
+    optimizer_workers: int = 2
+    optimizer_max_plans: int = 10
+    planner_debounce_ms: int = 250  # Result changes within this window share one live re-plan
+
     # -- Scoring Weights --
     weight_availability: float = 0.4
     weight_rating: float = 0.3
@@ -9,6 +9,10 @@ logger = logging.getLogger(__name__)
 
 _supabase: Optional[Client] = None
 
+# users columns added after the initial schema — databases that haven't run the
+# migration in supabase_schema.sql yet reject writes that include them
+_NEWER_USER_COLUMNS = ("google_token_expires_at",)
+
 
 def get_supabase() -> Client:
     global _supabase
@@ -42,15 +46,36 @@ async def get_user_by_id(user_id: str) -> Optional[dict]:
     return result.data[0] if result.data else None
 
 
+def _without_missing_columns(user_data: dict, error: Exception) -> Optional[dict]:
+    """user_data minus newer columns the error says don't exist, or None if that isn't the problem."""
+    missing = [c for c in _NEWER_USER_COLUMNS if c in user_data and c in str(error)]
+    if not missing:
+        return None
+    logger.warning(f"⚠️ users table is missing {missing} — run the migration in supabase_schema.sql")
+    return {k: v for k, v in user_data.items() if k not in missing}
+
+
 async def create_user(user_data: dict) -> dict:
     supabase = get_supabase()
-    result = supabase.table("users").insert(user_data).execute()
+    try:
+        result = supabase.table("users").insert(user_data).execute()
+    except Exception as e:
+        fallback = _without_missing_columns(user_data, e)
+        if fallback is None:
+            raise
+        result = supabase.table("users").insert(fallback).execute()
     return result.data[0]
 
 
 async def update_user(user_id: str, user_data: dict) -> dict:
     supabase = get_supabase()
-    result = supabase.table("users").update(user_data).eq("id", user_id).execute()
+    try:
+        result = supabase.table("users").update(user_data).eq("id", user_id).execute()
+    except Exception as e:
+        fallback = _without_missing_columns(user_data, e)
+        if fallback is None:
+            raise
+        result = supabase.table("users").update(fallback).eq("id", user_id).execute()
     return result.data[0] if result.data else None
 
 
@@ -0,0 +1,65 @@
+"""
+JSON encoding on orjson — returns bytes, several times faster than json.dumps.
+Used for WebSocket frames, JSON columns written to the DB and large API responses.
+WebSocket clients that opt into binary frames get the same payloads as MessagePack.
+
+Data that won't change again (a call's final transcript) is wrapped in FrozenJSON:
+it is encoded once and spliced as pre-encoded bytes into every payload that
+contains it, instead of being re-serialized per room, per write and per poll.
+"""
+from enum import Enum
+
+import msgpack
+import orjson
+from fastapi.responses import Response
+
+# Subclasses go through _default so FrozenJSON can substitute its cached encoding
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_SUBCLASS
+
+
+class FrozenJSON(list):
+    """An immutable-by-convention list whose JSON encoding is computed once."""
+    __slots__ = ("fragment",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.fragment = orjson.Fragment(orjson.dumps(list(self), default=_default, option=OPTIONS))
+
+
+def _default(obj):
+    if isinstance(obj, FrozenJSON):
+        return obj.fragment
+    if isinstance(obj, Enum):
+        return obj.value
+    # Plain-type subclasses arrive here because of OPT_PASSTHROUGH_SUBCLASS
+    for base in (dict, list, str, int, float):
+        if isinstance(obj, base):
+            return base(obj)
+    if isinstance(obj, (tuple, set)):
+        return list(obj)
+    return str(obj)  # Same fallback as json.dumps(default=str)
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+def dumps_str(obj) -> str:
+    """For text sinks — WebSocket text frames, DB JSON columns."""
+    return orjson.dumps(obj, default=_default, option=OPTIONS).decode()
+
+
+loads = orjson.loads
+
+
+def json_to_msgpack(text: str | bytes) -> bytes:
+    """Re-encode an already-encoded JSON payload as MessagePack."""
+    return msgpack.packb(orjson.loads(text))
+
+
+class JSONBytesResponse(Response):
+    """JSON response encoded with dumps(). Return it directly to skip FastAPI's jsonable_encoder pass."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -6,6 +6,7 @@ import logging
 from app.config import settings
 from app.routes import booking, providers, ws, tools, campaign, calendar_routes, webhooks, auth
 from app.routes import settings as settings_routes
+from app.scoring.optimizer import shutdown_executor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,8 +20,12 @@ async def lifespan(app: FastAPI):
     logger.info(f"   Spam Prevent: {settings.spam_prevent}")
     if settings.spam_prevent:
         logger.info(f"   Safe Numbers: {settings.safe_numbers_list}")
+    # Subscribe before serving so this worker receives broadcasts raised by the others
+    await ws.pubsub.start()
     yield
     logger.info("🛑 CallPilot shutting down...")
+    await ws.pubsub.stop()
+    shutdown_executor()
 
 
 app = FastAPI(title="CallPilot", version="0.3.0", lifespan=lifespan)
@@ -1,5 +1,5 @@
 """Campaign data models for swarm orchestration."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, confloat
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -99,4 +99,20 @@ class CampaignStartRequest(BaseModel):
     preferences: dict = Field(default_factory=lambda: {
         "availability": 0.4, "rating": 0.3, "distance": 0.2, "preference": 0.1
     })
-    preferred_providers: list[dict] = Field(default_factory=list)
\ No newline at end of file
+    preferred_providers: list[dict] = Field(default_factory=list)
+
+
+Weight = Optional[confloat(ge=0, allow_inf_nan=False)]
+
+
+class ScoringWeights(BaseModel):
+    """Ranker weights for what-if re-ranking; omitted ones keep their defaults."""
+    availability: Weight = None
+    rating: Weight = None
+    distance: Weight = None
+    preference: Weight = None
+
+
+class RerankRequest(BaseModel):
+    preferences: ScoringWeights = Field(default_factory=ScoringWeights)
+    campaign_id: Optional[str] = None
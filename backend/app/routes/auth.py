@@ -5,7 +5,7 @@ Uses Supabase for user persistence.
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 import httpx
 import jwt
@@ -13,6 +13,7 @@ import logging
 
 from app.config import settings
 from app.database import get_user_by_email, get_user_by_id, create_user, update_user
+from app.services.google_tokens import google_tokens
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -208,6 +209,7 @@ async def google_auth(request: GoogleAuthRequest):
             tokens = token_response.json()
             access_token = tokens.get("access_token")
             refresh_token = tokens.get("refresh_token")
+            expires_at = datetime.utcnow() + timedelta(seconds=tokens.get("expires_in", 3600))
             
             # Get user info from Google
             userinfo_response = await client.get(
@@ -238,6 +240,7 @@ async def google_auth(request: GoogleAuthRequest):
             "avatar_url": userinfo.get("picture"),
             "google_access_token": access_token,
             "google_refresh_token": refresh_token or existing_user.get("google_refresh_token"),
+            "google_token_expires_at": expires_at.isoformat() + "Z",
         }
         user = await update_user(user_id, updated_data)
         if not user:
@@ -252,10 +255,16 @@ async def google_auth(request: GoogleAuthRequest):
             "avatar_url": userinfo.get("picture"),
             "google_access_token": access_token,
             "google_refresh_token": refresh_token,
+            "google_token_expires_at": expires_at.isoformat() + "Z",
         }
         user = await create_user(user_data)
         user_id = user["id"]
         logger.info(f"✅ New user created: {email}")
+
+    google_tokens.store(
+        user_id, access_token, expires_at.replace(tzinfo=timezone.utc).timestamp(),
+        user.get("google_refresh_token"),
+    )
     
     # Create JWT session token
     token = create_token(user_id)
@@ -1,120 +1,218 @@
 """
 Calendar routes — fetch user calendar events.
+
+Events are kept in a per-user store: one full sync, then incremental syncs with
+Google's syncToken, with range queries answered from a local sorted index.
+Responses carry an ETag so an unchanged calendar costs the client a 304.
+Served as /api/calendar/events through calendar_routes.get_events.
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse
+from typing import Optional
+from datetime import datetime, timedelta
+import asyncio
+import bisect
+import time
+import uuid
 import httpx
 import logging
 
 from app.config import settings
 from app.routes.auth import get_current_user
+from app.services.google_tokens import google_tokens
+from app.tools.freebusy import day_start, to_minutes
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+EVENTS_URL = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
+
+
+def _parse_minutes(value: str) -> int:
+    """Event start/end (RFC3339 dateTime or YYYY-MM-DD date) → minutes, same scale as freebusy."""
+    if "T" not in value:
+        return to_minutes(datetime.strptime(value, "%Y-%m-%d"))
+    return to_minutes(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+class EventStore:
+    """One user's calendar events, kept current with incremental syncs."""
+
+    def __init__(self):
+        self.nonce = uuid.uuid4().hex[:8]  # Keeps ETags unique across restarts
+        self.version = 0
+        self.events: dict[str, dict] = {}  # id → {"event", "start", "end"}
+        self.sync_token: Optional[str] = None
+        self.window_start: Optional[str] = None  # YYYY-MM-DD the full sync started from
+        self.window_end: Optional[str] = None  # YYYY-MM-DD (exclusive) the full sync ran to
+        self.synced_at = 0.0
+        self.lock = asyncio.Lock()
+        self._starts: list[int] = []
+        self._ids: list[str] = []
+        self._max_duration = 0
+        self._dirty = False
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.nonce}-{self.version}"'
+
+    def reset(self):
+        self.events.clear()
+        self.sync_token = None
+        self._dirty = True
+
+    def apply(self, items: list[dict]) -> int:
+        """Upsert/delete a page of Google items. Returns how many changed."""
+        changed = 0
+        horizon = _parse_minutes(self.window_end) if self.window_end else None
+        for item in items:
+            eid = item.get("id")
+            if item.get("status") == "cancelled":
+                changed += self.events.pop(eid, None) is not None
+                continue
+            start = item.get("start", {})
+            end = item.get("end", {})
+            start_time = start.get("dateTime") or start.get("date")
+            end_time = end.get("dateTime") or end.get("date")
+            if not start_time or not end_time:
+                continue
+            # Incremental syncs can't carry timeMax — drop instances past the synced window
+            if horizon is not None and _parse_minutes(start_time) >= horizon:
+                changed += self.events.pop(eid, None) is not None
+                continue
+            self.events[eid] = {
+                # Same shape as CalendarService.get_events
+                "event": {
+                    "id": eid,
+                    "summary": item.get("summary", "Busy"),
+                    "start": start_time,
+                    "end": end_time,
+                    "all_day": "date" in start,
+                },
+                "start": _parse_minutes(start_time),
+                "end": _parse_minutes(end_time),
+            }
+            changed += 1
+        if changed:
+            self.version += 1
+            self._dirty = True
+        return changed
+
+    def _reindex(self):
+        order = sorted(self.events, key=lambda i: self.events[i]["start"])
+        self._ids = order
+        self._starts = [self.events[i]["start"] for i in order]
+        self._max_duration = max((e["end"] - e["start"] for e in self.events.values()), default=0)
+        self._dirty = False
+
+    def query(self, start: int, end: int) -> list[dict]:
+        """Events overlapping [start, end], by start time."""
+        if self._dirty:
+            self._reindex()
+        # No event is longer than _max_duration, so nothing starting earlier can reach `start`
+        lo = bisect.bisect_left(self._starts, start - self._max_duration)
+        hi = bisect.bisect_right(self._starts, end)
+        return [
+            self.events[i]["event"] for i in self._ids[lo:hi]
+            if self.events[i]["end"] > start
+        ]
+
+
+event_stores: dict[str, EventStore] = {}
+
+
+async def _google_get(client: httpx.AsyncClient, user: dict, params: dict) -> httpx.Response:
+    """GET the events list with the user's cached token; a 401 (e.g. revoked early) forces one refresh."""
+    access_token = await google_tokens.get_access_token(user)
+    response = await client.get(EVENTS_URL, params=params, headers={"Authorization": f"Bearer {access_token}"})
+
+    if response.status_code == 401:
+        logger.info("🔄 Access token rejected, refreshing...")
+        access_token = await google_tokens.refresh(user["id"])
+        if access_token:
+            response = await client.get(EVENTS_URL, params=params, headers={"Authorization": f"Bearer {access_token}"})
+
+    if response.status_code == 401:
+        raise HTTPException(status_code=401, detail="Token expired, please re-login")
+    return response
+
+
+async def _sync(store: EventStore, user: dict, client: httpx.AsyncClient):
+    """Full sync if there is no token (or Google expired it with 410), else incremental."""
+    full = store.sync_token is None
+    params = {"singleEvents": True, "maxResults": 2500}
+    if full:
+        store.reset()
+        # singleEvents expands recurrences — without timeMax an open-ended series never ends
+        params["timeMin"] = day_start(store.window_start)
+        params["timeMax"] = day_start(store.window_end)
+    else:
+        params["syncToken"] = store.sync_token
+
+    changed, page_token = 0, None
+    while True:
+        response = await _google_get(client, user, {**params, **({"pageToken": page_token} if page_token else {})})
+        if response.status_code == 410:
+            logger.info("🔄 Calendar sync token expired — full resync")
+            store.sync_token = None
+            return await _sync(store, user, client)
+        response.raise_for_status()
+        data = response.json()
+        changed += store.apply(data.get("items", []))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            store.sync_token = data.get("nextSyncToken")
+            break
+
+    if full:
+        store.version += 1
+    store.synced_at = time.monotonic()
+    logger.info(f"📅 Calendar {'full' if full else 'incremental'} sync: {changed} change(s), {len(store.events)} events")
+
 
 @router.get("/events")
 async def get_calendar_events(
+    request: Request,
     start: str = Query(..., description="Start date (ISO format)"),
     end: str = Query(..., description="End date (ISO format)"),
     user: dict = Depends(get_current_user)
 ):
     """Get events from the user's primary Google Calendar."""
-    
-    access_token = user.get("google_access_token")
-    if not access_token:
+
+    if not user.get("google_access_token"):
         raise HTTPException(status_code=401, detail="Google authentication required")
-    
-    # Format dates for Google API (RFC3339)
-    # Append time to make it full ISO format if just date provided
-    if "T" not in start:
-        time_min = f"{start}T00:00:00Z"
-    else:
-        time_min = start
-        
-    if "T" not in end:
-        time_max = f"{end}T23:59:59Z"
-    else:
-        time_max = end
-        
-    url = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
-    params = {
-        "timeMin": time_min,
-        "timeMax": time_max,
-        "singleEvents": True,
-        "orderBy": "startTime"
-    }
-    headers = {
-        "Authorization": f"Bearer {access_token}"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params, headers=headers)
-            
-            # If token expired, try to refresh
-            if response.status_code == 401 and user.get("google_refresh_token"):
-                logger.info("🔄 Access token expired, refreshing...")
-                
-                refresh_url = "https://oauth2.googleapis.com/token"
-                refresh_data = {
-                    "client_id": settings.google_oauth_client_id,
-                    "client_secret": settings.google_oauth_client_secret,
-                    "refresh_token": user["google_refresh_token"],
-                    "grant_type": "refresh_token"
-                }
-                
-                refresh_res = await client.post(refresh_url, data=refresh_data)
-                
-                if refresh_res.status_code == 200:
-                    tokens = refresh_res.json()
-                    new_access_token = tokens.get("access_token")
-                    
-                    # Update user in DB (in-memory specific hack)
-                    from app.routes.auth import users_db
-                    if user["id"] in users_db:
-                        users_db[user["id"]]["google_access_token"] = new_access_token
-                        logger.info("✅ Token refreshed and saved")
-                    
-                    # Retry request with new token
-                    headers["Authorization"] = f"Bearer {new_access_token}"
-                    response = await client.get(url, params=params, headers=headers)
-                else:
-                    logger.error(f"Failed to refresh token: {refresh_res.text}")
-                    # Continue to let it fail with 401
-            
-            if response.status_code == 401:
-                raise HTTPException(status_code=401, detail="Token expired, please re-login")
-                
-            response.raise_for_status()
-            data = response.json()
-            
-            items = data.get("items", [])
-            events = []
-            
-            for item in items:
-                # Skip cancelled events
-                if item.get("status") == "cancelled":
-                    continue
-                    
-                start = item.get("start", {})
-                end = item.get("end", {})
-                
-                # Handle all-day events vs timed events
-                start_time = start.get("dateTime") or start.get("date")
-                end_time = end.get("dateTime") or end.get("date")
-                
-                events.append({
-                    "id": item.get("id"),
-                    "title": item.get("summary", "Busy"),
-                    "start": start_time,
-                    "end": end_time,
-                    "allDay": "date" in start
-                })
-                
-            return {"events": events}
-            
-        except httpx.RequestError as e:
-            logger.error(f"HTTP error fetching calendar events: {e}")
-            raise HTTPException(status_code=500, detail="Failed to fetch calendar events")
+    return await user_events(user, start, end, request.headers.get("if-none-match"))
+
+
+async def user_events(user: dict, start: str, end: str, if_none_match: Optional[str] = None) -> Response:
+    """Events overlapping [start, end] from the user's synced store, with ETag/304 handling."""
+    store = event_stores.setdefault(user["id"], EventStore())
+    start_date, end_date = start[:10], end[:10]
+
+    async with store.lock:
+        # A range outside the synced window needs a new full sync covering it
+        if store.window_start is None or start_date < store.window_start or end_date >= store.window_end:
+            today = datetime.utcnow().date()
+            past = (today - timedelta(days=settings.calendar_events_past_days)).isoformat()
+            future = (today + timedelta(days=settings.calendar_events_future_days)).isoformat()
+            next_day = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).date().isoformat()
+            store.window_start = min(start_date, past, store.window_start or past)
+            store.window_end = max(next_day, future, store.window_end or future)
+            store.sync_token = None
+        if store.sync_token is None or time.monotonic() - store.synced_at >= settings.calendar_events_sync_seconds:
+            async with httpx.AsyncClient() as client:
+                try:
+                    await _sync(store, user, client)
+                except httpx.RequestError as e:
+                    logger.error(f"HTTP error fetching calendar events: {e}")
+                    if store.sync_token is None:
+                        raise HTTPException(status_code=500, detail="Failed to fetch calendar events")
+
+    # The browser keys cached responses by URL, so the store version alone identifies the body
+    headers = {"ETag": store.etag, "Cache-Control": "private, no-cache"}
+    if if_none_match == store.etag:
+        return Response(status_code=304, headers=headers)
+
+    range_start = _parse_minutes(start)
+    range_end = _parse_minutes(end) if "T" in end else _parse_minutes(end) + 1440
+    return JSONResponse({"events": store.query(range_start, range_end)}, headers=headers)
@@ -1,5 +1,5 @@
 """Calendar events endpoint — lets frontend show user's schedule."""
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 import logging
 
 router = APIRouter()
@@ -12,21 +12,52 @@ def _get_cal():
     if _cal is None:
         try:
             from app.tools.calendar_tool import CalendarService
-            _cal = CalendarService()
+            from app.tools.async_calendar import AsyncCalendarService
+            _cal = AsyncCalendarService(CalendarService())
         except Exception as e:
             logger.warning(f"⚠️ Calendar not available: {e}")
     return _cal
 
 
 @router.get("/events")
-async def get_events(start: str, end: str):
-    """Get user's calendar events. start/end in YYYY-MM-DD format."""
+async def get_events(start: str, end: str, request: Request):
+    """
+    Get user's calendar events. start/end in YYYY-MM-DD format.
+    Signed-in Google users are served from their incrementally synced event store
+    (ETag / 304 aware); everyone else sees the shared token.json calendar.
+    """
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        from app.routes.auth import verify_token
+        from app.database import get_user_by_id
+        user_id = verify_token(auth_header.split(" ")[1])
+        user = None
+        try:
+            user = await get_user_by_id(user_id) if user_id else None
+        except Exception as e:
+            # DB down or unconfigured — still show the shared calendar
+            logger.warning(f"⚠️ Could not load user {user_id}: {e}")
+        if user and user.get("google_access_token"):
+            from app.routes.calendar import user_events
+            try:
+                return await user_events(user, start, end, request.headers.get("if-none-match"))
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Calendar events error: {e}")
+                return {"events": [], "error": str(e)}
     cal = _get_cal()
     if not cal:
         return {"events": [], "error": "Calendar not connected"}
     try:
-        events = cal.get_events(start, end)
+        events = await cal.get_events(start, end)
         return {"events": events}
     except Exception as e:
         logger.error(f"❌ Calendar events error: {e}")
-        return {"events": [], "error": str(e)}
\ No newline at end of file
+        return {"events": [], "error": str(e)}
+
+@router.get("/metrics")
+async def calendar_metrics():
+    """Per-method Google Calendar call counts and latency."""
+    from app.tools.async_calendar import metrics
+    return {"calendar": metrics.snapshot()}
@@ -1,12 +1,22 @@
 """Campaign start/status/cancel/confirm endpoints."""
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from typing import Optional
 from app.agents.swarm_orchestrator import CampaignManager
+from app.config import settings
+from app.models.campaign import RerankRequest
+from app.encoding import JSONBytesResponse
 from app.routes.auth import verify_token
 import logging
+import time
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# group_id → {"version": results_version, "results": {(k, time_budget_ms): (expires, optimizer result)}}
+_optimize_cache: dict = {}
+
 
 @router.post("/start")
 async def start_campaign(request: Request):
@@ -38,7 +48,8 @@ async def get_campaign(group_id: str):
     group = CampaignManager.get_group(group_id)
     if not group:
         return {"error": "Campaign not found"}
-    return group
+    # Polled continuously; orjson + pre-encoded transcripts instead of jsonable_encoder
+    return JSONBytesResponse(group)
 
 
 @router.post("/{group_id}/cancel")
@@ -48,19 +59,118 @@ async def cancel_campaign(group_id: str):
         group["status"] = "cancelled"
         for c in group["campaigns"]:
             c["status"] = "cancelled"
+        CampaignManager.bump_results_version(group_id)
     return {"status": "cancelled"}
 
 
 @router.get("/{group_id}/optimize")
-async def optimize_campaign(group_id: str):
-    """Run multi-appointment optimization across all campaigns in the group."""
-    from app.scoring.optimizer import optimize_appointments
+async def optimize_campaign(group_id: str, k: int = 1, time_budget_ms: Optional[int] = Query(None, ge=0)):
+    """
+    Run multi-appointment optimization across all campaigns in the group.
+    Returns the best k distinct plans; with time_budget_ms the search stops early
+    and reports proven_optimal=False if it could not finish (0 = first plan found).
+    Runs in a worker process.
+    """
+    from app.scoring.optimizer import optimize_in_worker, collect_options, options_date_range
+    from app.agents.swarm_orchestrator import distances
+    from app.routes.tools import get_user_calendar
+    from app.tools.freebusy import load_busy_index
     group = CampaignManager.get_group(group_id)
     if not group:
         return {"error": "Campaign not found"}
-    result = optimize_appointments(group)
+
+    # Memoized per (group, results version, parameters) — polling is a dict lookup. Entries
+    # expire with the free/busy cache, so calendar changes reach the plan within that TTL.
+    k = max(1, min(k, settings.optimizer_max_plans))
+    version = group.get("results_version", 0)
+    cached = _optimize_cache.get(group_id)
+    if not cached or cached["version"] != version:
+        cached = _optimize_cache[group_id] = {"version": version, "results": {}}
+    params = (k, time_budget_ms)
+    hit = cached["results"].get(params)
+    if hit and hit[0] > time.monotonic():
+        return JSONBytesResponse(hit[1])
+
+    # Drive times between every booked provider pair (cached by DistanceService)
+    booked_ids = {r.get("provider_id") for c in group["campaigns"] for r in c["results"] if r.get("status") == "booked"}
+    points = [
+        {"provider_id": p["provider_id"], "lat": p.get("lat", 0), "lng": p.get("lng", 0)}
+        for c in group["campaigns"] for p in c["providers"] if p.get("provider_id") in booked_ids
+    ]
+    drive_minutes = await distances.get_drive_times(points) if len(points) > 1 else {}
+
+    # User's existing calendar for the plan's date range — one query, then local lookups
+    busy = None
+    date_range = options_date_range(collect_options(group))
+    if date_range:
+        busy = await load_busy_index(await get_user_calendar(group.get("user_id")), *date_range)
+
+    time_budget_s = time_budget_ms / 1000 if time_budget_ms is not None else None
+    result = await optimize_in_worker(group, drive_minutes, k, time_budget_s, busy)
+    result["results_version"] = version
     logger.info(f"📊 Optimization result: {result}")
-    return result
+
+    # Only cache if nothing changed while the search was running
+    if group.get("results_version", 0) == version:
+        cached["results"][params] = (time.monotonic() + settings.freebusy_ttl_seconds, result)
+    return JSONBytesResponse(result)
+
+
+@router.post("/{group_id}/rerank")
+async def rerank_campaign(group_id: str, request: Request):
+    """
+    What-if re-ranking: apply new scoring weights to completed campaigns using
+    their cached feature vectors. Read-only — stored results are not modified.
+    """
+    from app.agents.swarm_orchestrator import score_features
+    from app.scoring.ranker import rerank_features
+    group = CampaignManager.get_group(group_id)
+    if not group:
+        return {"error": "Campaign not found"}
+
+    try:
+        data = await request.json()
+    except ValueError as e:  # JSONDecodeError, or a body that isn't UTF-8
+        # Same error FastAPI gives a declared body that fails to parse
+        raise RequestValidationError([{
+            "type": "json_invalid", "loc": ("body", getattr(e, "pos", 0)),
+            "msg": "JSON decode error", "input": {}, "ctx": {"error": getattr(e, "msg", str(e))},
+        }])
+    # Weights may be sent under "preferences" or at the top level
+    if isinstance(data, dict) and "preferences" not in data:
+        data = {"preferences": data, "campaign_id": data.get("campaign_id")}
+    try:
+        body = RerankRequest.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_input=False))
+    preferences = body.preferences.model_dump(exclude_none=True)
+    only_campaign = body.campaign_id
+
+    reranked = []
+    for camp in group["campaigns"]:
+        if only_campaign and camp["campaign_id"] != only_campaign:
+            continue
+        cached = score_features.get(camp["campaign_id"])
+        if not cached:
+            reranked.append({
+                "campaign_id": camp["campaign_id"], "service_type": camp["service_type"],
+                "reranked": False, "reason": "Campaign not completed",
+            })
+            continue
+
+        order, scores = rerank_features(cached, preferences)
+        by_id = {r.get("provider_id"): r for r in camp["results"]}
+        results = [
+            {**by_id.get(cached["provider_ids"][i], {}), "score": float(scores[i])}
+            for i in order
+        ]
+        booked = [r for r in results if r.get("status") == "booked"]
+        reranked.append({
+            "campaign_id": camp["campaign_id"], "service_type": camp["service_type"],
+            "reranked": True, "results": results, "best_match": booked[0] if booked else None,
+        })
+
+    return {"group_id": group_id, "preferences": preferences, "campaigns": reranked}
 
 
 @router.post("/{group_id}/confirm/{provider_id}")
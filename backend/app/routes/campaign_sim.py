@@ -1,7 +1,7 @@
 import logging
 import asyncio
 import random
-from app.routes.ws import broadcast
+from app.routes.ws import broadcast_campaign
 
 logger = logging.getLogger(__name__)
 
@@ -37,10 +37,7 @@ async def run_campaign_simulation(campaign_id: str, campaigns_db: dict, service_
         campaigns_db[campaign_id]["calls"] = initial_calls
         
         # Broadcast update
-        await broadcast(campaign_id, {
-            "type": "campaign_update",
-            "campaign": campaigns_db[campaign_id]
-        })
+        await broadcast_campaign(campaign_id, campaigns_db[campaign_id])
         
     # 2. Simulate Calls
     for _ in range(3):
@@ -76,10 +73,7 @@ async def run_campaign_simulation(campaign_id: str, campaigns_db: dict, service_
                 "text": random.choice(messages)
             })
             
-            await broadcast(campaign_id, {
-                "type": "campaign_update",
-                "campaign": campaigns_db[campaign_id]
-            })
+            await broadcast_campaign(campaign_id, campaigns_db[campaign_id])
 
     # 3. Finish
     await asyncio.sleep(2)
@@ -101,7 +95,4 @@ async def run_campaign_simulation(campaign_id: str, campaigns_db: dict, service_
         if campaigns_db[campaign_id]["ranked_results"]:
             campaigns_db[campaign_id]["best_match"] = campaigns_db[campaign_id]["ranked_results"][0]
             
-        await broadcast(campaign_id, {
-            "type": "campaign_update",
-            "campaign": campaigns_db[campaign_id]
-        })
+        await broadcast_campaign(campaign_id, campaigns_db[campaign_id])
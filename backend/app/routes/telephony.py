@@ -4,7 +4,7 @@ Telephony routes — Handle webhooks from Twilio/ElevenLabs.
 """
 from fastapi import APIRouter, Request, HTTPException
 import logging
-from app.routes.ws import broadcast
+from app.routes.ws import broadcast_campaign
 from app.agents.swarm_orchestrator import campaign_groups
 
 router = APIRouter()
@@ -68,10 +68,7 @@ async def handle_elevenlabs_status(request: Request):
              call["transcript"].append({"role": "system", "text": f"Summary: {transcript_summary}"})
 
     # Broadcast update
-    await broadcast(campaign_id, {
-        "type": "campaign_update",
-        "campaign": campaign
-    })
+    await broadcast_campaign(campaign_id, campaign)
     
     return {"status": "ok"}
 
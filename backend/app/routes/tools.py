@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 from app import database as db
 from app.routes.ws import broadcast
 from app.scoring.ranker import compute_score
+from app.tools.freebusy import CALLPILOT_MARKER, freebusy_cache
+from app.tools.holds import slot_holds
+from app.tools.calendar_sync import calendar_sync
 from app.agents.swarm_orchestrator import campaign_groups
 
 confirmed_bookings = []
@@ -26,12 +29,31 @@ def get_calendar():
     if _calendar_service is None:
         try:
             from app.tools.calendar_tool import CalendarService
-            _calendar_service = CalendarService()
+            from app.tools.async_calendar import AsyncCalendarService
+            _calendar_service = AsyncCalendarService(CalendarService())
         except Exception as e:
             logger.warning(f"⚠️ Calendar not available: {e}")
     return _calendar_service
 
 
+async def get_user_calendar(user_id: Optional[str]):
+    """The user's own calendar client; the shared token.json calendar if they have no Google tokens."""
+    if user_id and user_id != "default":
+        from app.tools.calendar_pool import calendar_pool
+        cal = await calendar_pool.get(user_id)
+        if cal:
+            return cal
+    return get_calendar()
+
+
+def _user_for_campaign(campaign_id: str) -> str:
+    """user_id of the group owning a campaign ("default" if unknown)."""
+    for group in campaign_groups.values():
+        if any(c["campaign_id"] == campaign_id for c in group["campaigns"]):
+            return group.get("user_id") or "default"
+    return "default"
+
+
 async def parse_body(request: Request) -> dict:
     raw = await request.body()
     text = raw.decode("utf-8", errors="replace")
@@ -126,28 +148,85 @@ async def check_calendar(request: Request):
         except Exception as e:
             logger.error(f"⚠️ Live score calc failed: {e}")
 
-    # Try real Google Calendar
+    return await _check_slot(cid, pid, date, time, dur)
+
+
+async def _check_slot(cid: str, pid: str, date: str, time: str, dur: int) -> dict:
+    """Holds + free/busy check for one slot; leaves this call holding it if available."""
+    user_id = _user_for_campaign(cid)
+    owner = (cid, pid)
+
+    # Another parallel call already holding an overlapping slot? Check and hold with no
+    # await in between, so two calls can't both pass before either holds.
+    placed = previous = None
+    try:
+        held = slot_holds.conflict(user_id, owner, date, time, dur)
+        if not held:
+            placed, previous = slot_holds.hold(user_id, owner, date, time, dur)
+    except ValueError:
+        held = None
+    if held:
+        logger.info(f"🔒 Slot {date} {time} held by {held['provider_id']}")
+        return {"available": False, "message": f"Conflict on {date} at {time}: that time is being booked with another provider. Ask for alternative."}
+
+    # Real Google Calendar, answered from the per-user free/busy cache
+    available = None
     try:
-        cal = get_calendar()
+        cal = await get_user_calendar(user_id)
         if cal:
-            available = cal.check_availability(date, time, dur)
-            if not available:
-                return {"available": False, "message": f"Conflict on {date} at {time}. Ask for alternative."}
-            return {"available": True, "message": f"User is free on {date} at {time}. Proceed to confirm."}
+            available = await freebusy_cache.is_free(cal, user_id, date, time, dur)
     except Exception as e:
         logger.warning(f"⚠️ Calendar fallback: {e}")
 
     # Fallback mock: busy at 2 PM
-    if time.startswith("14:"):
+    if available is None:
+        available = not time.startswith("14:")
+
+    if not available:
+        # Only undo the hold taken above — not one this call had from an earlier check
+        slot_holds.revert(user_id, owner, placed, previous)
         return {"available": False, "message": f"Conflict on {date} at {time}. Ask for alternative."}
     return {"available": True, "message": f"User is free on {date} at {time}. Proceed to confirm."}
 
 
 @router.post("/confirm-booking")
 async def confirm_booking(request: Request):
+    data = await parse_body(request)
+    return await _confirm(data, data.get("duration_minutes", 60))
+
+
+@router.post("/book-slot")
+async def book_slot(request: Request):
+    """
+    Check, hold and confirm in one round trip — for when the receptionist offers a slot
+    outright. Takes confirm-booking's fields; nothing is booked if the slot conflicts.
+    """
     data = await parse_body(request)
     cid = data.get("campaign_id", "")
     pid = data.get("provider_id", "")
+    date = data.get("appointment_date", "")
+    time = data.get("appointment_time", "")
+    dur = data.get("duration_minutes", 60)
+
+    if not date or not time:
+        return {"success": False, "available": False,
+                "message": "Need appointment_date (YYYY-MM-DD) and appointment_time (HH:MM)."}
+
+    logger.info(f"⚡ Book slot: {data.get('provider_name', 'Unknown')} on {date} at {time} [campaign={cid}]")
+    check = await _check_slot(cid, pid, date, time, dur)
+    if not check["available"]:
+        await _track_campaign(cid, pid, {}, {
+            "type": "tool_called", "campaign_id": cid, "provider_id": pid,
+            "tool": "book_slot", "params": {"date": date, "time": time}, "available": False,
+        })
+        return {"success": False, **check}
+    return {**(await _confirm(data, dur)), "available": True}
+
+
+async def _confirm(data: dict, duration_minutes: int = 60) -> dict:
+    """Record a booking: calendar event, DB row, campaign result and broadcast."""
+    cid = data.get("campaign_id", "")
+    pid = data.get("provider_id", "")
     name = data.get("provider_name", "Unknown")
     date = data.get("appointment_date", "")
     time = data.get("appointment_time", "")
@@ -166,21 +245,19 @@ async def confirm_booking(request: Request):
         "calendar_event_id": None,
     }
 
-    # Create Google Calendar event
+    owner_id = _user_for_campaign(cid)
     try:
-        cal = get_calendar()
-        if cal and date and time:
-            eid = cal.create_event(
-                summary=f"{svc} at {name}", date_str=date, time_str=time,
-                duration_minutes=60,
-                description=f"Booked by CallPilot\nProvider: {name}\nService: {svc}\nNotes: {notes}"
-            )
-            booking["calendar_event_id"] = eid
-            logger.info(f"📆 Calendar event: {eid}")
-    except Exception as e:
-        logger.warning(f"⚠️ Calendar event error: {e}")
+        slot_holds.confirm(owner_id, (cid, pid), date, time, duration_minutes)
+    except ValueError:
+        pass
+
+    # Calendar event is created in the background; the slot is busy from now on
+    cal = await get_user_calendar(owner_id)
+    if cal and date and time:
+        freebusy_cache.mark_busy(owner_id, date, time, duration_minutes)
 
     confirmed_bookings.append(booking)
+    db_booking = None
 
     # --- DB PERSISTENCE: Save booking to database ---
     try:
@@ -241,6 +318,16 @@ async def confirm_booking(request: Request):
     except Exception as e:
         logger.warning(f"⚠️ DB booking save failed: {e}", exc_info=True)
 
+    # Queue the Google Calendar event — the worker patches calendar_event_id into both records
+    calendar_queued = False
+    if cal and date and time:
+        calendar_sync.enqueue(owner_id, booking, {
+            "summary": f"{svc} at {name}", "date_str": date, "time_str": time,
+            "duration_minutes": duration_minutes,
+            "description": f"{CALLPILOT_MARKER}\nProvider: {name}\nService: {svc}\nNotes: {notes}",
+        }, db_booking_id=db_booking["id"] if db_booking else None)
+        calendar_queued = True
+
     # Track in campaign (now awaited)
     await _track_campaign(cid, pid, {
         "status": "booked", "provider_name": name,
@@ -254,7 +341,7 @@ async def confirm_booking(request: Request):
     return {
         "success": True, "booking_id": booking["id"],
         "message": f"Booked with {name} on {date} at {time} for {svc}.",
-        "calendar_event_created": booking["calendar_event_id"] is not None,
+        "calendar_event_queued": calendar_queued,
     }
 
 
@@ -269,6 +356,7 @@ async def no_availability(request: Request):
     provider_id = data.get("provider_id", "")
 
     logger.info(f"❌ No availability: {name} — {reason} [campaign={cid}]")
+    slot_holds.release(_user_for_campaign(cid), (cid, pid))
 
     # Now awaited
     await _track_campaign(cid, pid, {
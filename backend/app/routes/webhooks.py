@@ -3,6 +3,7 @@ from fastapi import APIRouter, Request
 import logging
 import json
 import asyncio
+from app.encoding import FrozenJSON, dumps_str
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -47,6 +48,7 @@ async def handle_post_call(request: Request):
                     })
             elif isinstance(transcript, str):
                 formatted = [{"role": "system", "message": transcript, "time": 0}]
+            formatted = FrozenJSON(formatted)
 
             # Now awaited since update_provider_result is async
             await CampaignManager.update_provider_result(campaign_id, provider_id, {
@@ -60,7 +62,7 @@ async def handle_post_call(request: Request):
                 db_call_id = mapping.get("db_call_id")
                 if db_call_id:
                     update_data = {
-                        "transcript": json.dumps(formatted),
+                        "transcript": dumps_str(formatted),
                         "ended_at": json.dumps(metadata.get("ended_at")) if metadata.get("ended_at") else None,
                     }
                     # Calculate duration if we have timing info
@@ -1,41 +1,433 @@
-"""WebSocket manager — push real-time updates to frontend."""
+"""
+WebSocket manager — push real-time updates to frontend. broadcast() publishes through
+app.services.pubsub so events reach clients connected to any worker; each worker
+delivers to its own sockets and pings them to reap dead connections.
+"""
+import asyncio
 import json
 import logging
+from collections import deque
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from app.config import settings
+from app.encoding import dumps_str, json_to_msgpack, loads
+from app.services.pubsub import create_pubsub
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Maps room_id (group_id or campaign_id) -> list of WebSockets
-active_connections: dict[str, list[WebSocket]] = {}
+# Close code for clients shed because their send queue overflowed ("Try Again Later")
+SLOW_CONSUMER_CODE = 1013
+# Close code for clients that stopped answering heartbeats ("Going Away")
+HEARTBEAT_TIMEOUT_CODE = 1001
+
+PING = '{"type": "ping"}'
+
+# Sent without waiting for the batch window (after anything already queued for the room)
+IMMEDIATE_EVENTS = {
+    "booking_confirmed", "no_availability", "call_ended", "call_failed",
+    "call_disconnected", "campaign_complete", "campaign_error", "user_instruction",
+}
+
+# Per-provider transcript events go to "transcript:<provider_id>"; everything else to "status"
+TRANSCRIPT_EVENTS = {"transcript_update", "transcript_final", "transcript_loaded"}
+
+
+def topic_of(message: dict) -> str:
+    if message.get("type") in TRANSCRIPT_EVENTS and message.get("provider_id"):
+        return f"transcript:{message['provider_id']}"
+    return "status"
+
+
+class Client:
+    """One connected socket with its own bounded outbound queue, drained by a writer task."""
+
+    def __init__(self, ws: WebSocket, room_id: str, binary: bool = False):
+        self.ws = ws
+        self.room_id = room_id
+        # MessagePack in binary frames instead of JSON text frames
+        self.binary = binary
+        self.deflate = "permessage-deflate" in ws.headers.get("sec-websocket-extensions", "")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+        self.writer: asyncio.Task | None = None
+        self.sent = 0
+        # Loop time of the last message from the client — any message counts as a pong
+        self.last_seen = asyncio.get_running_loop().time()
+        # "*" = everything (the default); "transcript:*" = every provider's transcript
+        self.topics: set[str] = {"*"}
+        # Version of the last campaign_update snapshot sent — replayed patches up to it are skipped
+        self.campaign_version = 0
+
+    def wants(self, topic: str) -> bool:
+        return "*" in self.topics or topic in self.topics \
+            or (topic.startswith("transcript:") and "transcript:*" in self.topics)
+
+    def start(self):
+        self.writer = asyncio.create_task(self._write())
+
+    def enqueue(self, msg: str | bytes, convert: bool = True) -> bool:
+        """Non-blocking; False if the queue is full. JSON text is converted for binary clients."""
+        if convert and self.binary and isinstance(msg, str):
+            msg = json_to_msgpack(msg)
+        try:
+            self.queue.put_nowait(msg)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write(self):
+        try:
+            while True:
+                msg = await self.queue.get()
+                if isinstance(msg, bytes):
+                    await self.ws.send_bytes(msg)
+                else:
+                    await self.ws.send_text(msg)
+                self.sent += 1
+                metrics["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _remove(self)
+
+    async def close(self, code: int = 1000):
+        if self.writer:
+            self.writer.cancel()
+        try:
+            await self.ws.close(code=code)
+        except Exception:
+            pass
+
+
+# Maps room_id (group_id or campaign_id) -> clients connected to this worker
+active_connections: dict[str, set[Client]] = {}
+
+# room_id -> {"version": int, "campaign": last broadcast state, JSON-normalized}
+campaign_snapshots: dict[str, dict] = {}
+
+# room_id -> (topic, encoded message) waiting for the room's batch window to close
+_pending: dict[str, list[tuple[str, str]]] = {}
+
+# room_id -> {"epoch", "seq": last sequence number,
+#             "buffer": deque of (seq, topic, encoded message, campaign_patch version or None)}.
+# (epoch, seq) are assigned by the pub/sub backend, so all workers agree on them; the epoch names the
+# sequence — a restart (or an expired room) starts a new one, so clients know to reset.
+_history: dict[str, dict] = {}
+
+metrics = {"sent": 0, "enqueued": 0, "slow_consumers_dropped": 0, "batches": 0, "heartbeat_reaped": 0}
+
+_heartbeat: asyncio.Task | None = None
+
+
+def _remove(client: Client):
+    clients = active_connections.get(client.room_id)
+    if clients and client in clients:
+        clients.discard(client)
+        if not clients:
+            del active_connections[client.room_id]
+    if client.writer and client.writer is not asyncio.current_task():
+        client.writer.cancel()
 
 
 @router.websocket("/ws/transcript/{room_id}")
-async def websocket_endpoint(ws: WebSocket, room_id: str):
+async def websocket_endpoint(ws: WebSocket, room_id: str, since: int | None = None,
+                             epoch: str | None = None, format: str = "json"):
+    """
+    `since` is the last sequence number the client saw and `epoch` the sequence it belongs
+    to: it is sent the events after it (or a snapshot if those have left the replay
+    buffer). 0, or an epoch from before a restart, replays from the start.
+    `format=msgpack` switches outgoing frames to binary MessagePack; client messages stay JSON.
+    permessage-deflate is negotiated by the server (uvicorn --ws-per-message-deflate) when offered.
+    """
     await ws.accept()
-    if room_id not in active_connections:
-        active_connections[room_id] = []
-    active_connections[room_id].append(ws)
+    client = Client(ws, room_id, binary=format == "msgpack")
+    client.start()
+    active_connections.setdefault(room_id, set()).add(client)
+    _ensure_heartbeat()
     logger.info(f"📡 WS connected: {room_id} ({len(active_connections[room_id])} clients)")
+    if room_id in campaign_snapshots:
+        _send_campaign_snapshot(client)
+    if since is not None:
+        _replay(client, since, epoch)
     try:
         while True:
-            await ws.receive_text()
+            text = await ws.receive_text()
+            client.last_seen = asyncio.get_running_loop().time()
+            try:
+                data = loads(text)
+            except json.JSONDecodeError:
+                continue
+            # Client saw a version gap (or lost state) — send it a fresh full snapshot
+            if not isinstance(data, dict):
+                continue
+            if data.get("type") == "resync" and room_id in campaign_snapshots:
+                _send_campaign_snapshot(client)
+            elif data.get("type") == "resume":
+                since = data.get("since") or 0
+                if isinstance(since, int) and not isinstance(since, bool) and since >= 0:
+                    _replay(client, since, data.get("epoch"))
+            elif data.get("type") in ("subscribe", "unsubscribe"):
+                topics = {t for t in data.get("topics", []) if isinstance(t, str)}
+                if data["type"] == "subscribe":
+                    client.topics |= topics
+                else:
+                    client.topics -= topics
+                client.enqueue(dumps_str({"type": "subscribed", "topics": sorted(client.topics)}))
     except WebSocketDisconnect:
-        if room_id in active_connections and ws in active_connections[room_id]:
-            active_connections[room_id].remove(ws)
         logger.info(f"📡 WS disconnected: {room_id}")
+    except RuntimeError:
+        pass  # Closed by us (slow consumer / heartbeat timeout) while waiting to receive
+    finally:
+        _remove(client)
+
+
+def _ensure_heartbeat():
+    global _heartbeat
+    if settings.ws_heartbeat_seconds > 0 and (_heartbeat is None or _heartbeat.done()):
+        _heartbeat = asyncio.get_running_loop().create_task(_heartbeat_loop())
+
+
+async def _heartbeat_loop():
+    """
+    Ping every client each interval and close the ones that sent nothing (not even
+    a pong) within ws_heartbeat_timeout_seconds. Exits once the worker has no clients.
+    """
+    while active_connections:
+        await asyncio.sleep(settings.ws_heartbeat_seconds)
+        now = asyncio.get_running_loop().time()
+        for clients in list(active_connections.values()):
+            for client in list(clients):
+                if now - client.last_seen <= settings.ws_heartbeat_timeout_seconds:
+                    client.enqueue(PING, convert=False)  # Text for every client, msgpack or not
+                    continue
+                logger.info(f"💤 Reaping unresponsive WS client in {client.room_id}")
+                metrics["heartbeat_reaped"] += 1
+                _remove(client)
+                asyncio.create_task(client.close(HEARTBEAT_TIMEOUT_CODE))
+
+
+@router.get("/api/ws/metrics")
+async def ws_metrics():
+    """Connection counts, per-client queue depth and drop counters."""
+    return {
+        **metrics,
+        "rooms": {
+            room_id: [
+                {"queue_depth": c.queue.qsize(), "sent": c.sent, "format": "msgpack" if c.binary else "json",
+                 "deflate": c.deflate}
+                for c in clients
+            ]
+            for room_id, clients in active_connections.items()
+        },
+    }
 
 
 async def broadcast(room_id: str, message: dict):
-    """Send message to all WebSocket clients in a room."""
+    """Send message to all WebSocket clients in a room, on every worker."""
+    await pubsub.publish(room_id, {"event": message}, sequenced=True)
+
+
+async def _deliver(room_id: str, payload: dict):
+    """Pub/sub handler — runs on every worker for every published room message."""
+    if "campaign" in payload:
+        campaign_snapshots[room_id] = {"version": payload["version"], "campaign": payload["campaign"]}
+        if "event" not in payload:
+            # First state: a full snapshot, outside the event sequence
+            _flush(room_id)
+            _send(room_id, [("status", _snapshot_message(room_id))])
+    if "event" in payload:
+        _broadcast_local(room_id, payload["event"], payload["epoch"], payload["seq"])
+
+
+pubsub = create_pubsub(_deliver)
+
+
+def _broadcast_local(room_id: str, message: dict, epoch: str, seq: int):
+    """
+    Deliver to this worker's clients in the room. Messages arriving within
+    settings.ws_batch_window_ms are coalesced into one {"type": "batch", "messages": [...]}
+    frame, in order; IMMEDIATE_EVENTS flush the window and go out at once.
+    """
+    # Stamp and keep every event, even with nobody connected, so late joiners can catch up
+    history = _history.get(room_id)
+    if history is None or history["epoch"] != epoch:
+        history = _history[room_id] = {
+            "epoch": epoch, "seq": 0, "buffer": deque(maxlen=settings.ws_replay_buffer_size),
+        }
+    history["seq"] = max(history["seq"], seq)
+    # Encode now — callers often pass live dicts that keep changing during the window
+    topic = topic_of(message)
+    msg = dumps_str({**message, "seq": seq, "epoch": epoch})
+    patch_version = message.get("version") if message.get("type") == "campaign_patch" else None
+    history["buffer"].append((seq, topic, msg, patch_version))
     if room_id not in active_connections or not active_connections[room_id]:
         return
-    msg = json.dumps(message, default=str)
-    dead = []
-    for ws in active_connections[room_id]:
-        try:
-            await ws.send_text(msg)
-        except Exception:
-            dead.append(ws)
-    for ws in dead:
-        active_connections[room_id].remove(ws)
\ No newline at end of file
+
+    pending = _pending.get(room_id)
+    if pending is None:
+        _pending[room_id] = [(topic, msg)]
+        if settings.ws_batch_window_ms > 0:
+            asyncio.get_running_loop().call_later(settings.ws_batch_window_ms / 1000, _flush, room_id)
+    else:
+        pending.append((topic, msg))
+    if settings.ws_batch_window_ms <= 0 or message.get("type") in IMMEDIATE_EVENTS:
+        _flush(room_id)
+
+
+def _replay(client: Client, since: int, epoch: str | None = None):
+    """Send a (re)connecting client what it missed after `since`, or a snapshot if that's gone."""
+    history = _history.get(client.room_id)
+    if not history:
+        return
+    if epoch is not None and epoch != history["epoch"]:
+        since = 0  # Numbered by an earlier server run — everything here is new to the client
+    elif since > history["seq"]:
+        since = -1  # Ahead of us without an epoch to tell why — only a snapshot can realign it
+    if since >= history["seq"]:
+        return
+    after = [entry for entry in history["buffer"] if entry[0] > since] if since >= 0 else []
+    # Replay only an unbroken run — events may have left the buffer or never reached this worker
+    if after and len(after) == history["seq"] - since:
+        # Patches already folded into the campaign snapshot the client was sent would apply twice
+        missed = [
+            msg for _, topic, msg, patch_version in after
+            if client.wants(topic) and (patch_version is None or patch_version > client.campaign_version)
+        ]
+        if missed:
+            client.enqueue(_frame(missed))
+        return
+    snapshot = _room_snapshot(client.room_id)
+    if snapshot is not None:
+        client.enqueue(dumps_str({
+            "type": "snapshot", "seq": history["seq"], "epoch": history["epoch"], "group": snapshot,
+        }))
+
+
+def _room_snapshot(room_id: str) -> dict | None:
+    """Compact current state of a campaign group room — everything but transcripts."""
+    from app.agents.swarm_orchestrator import campaign_groups
+    group = campaign_groups.get(room_id)
+    if not group:
+        return None
+
+    def compact(result: dict | None) -> dict | None:
+        return {k: v for k, v in result.items() if k != "transcript"} if result else None
+
+    return {
+        "group_id": group["group_id"], "status": group["status"],
+        "results_version": group.get("results_version", 0),
+        "campaigns": [
+            {
+                "campaign_id": c["campaign_id"], "service_type": c["service_type"],
+                "status": c["status"], "providers": c["providers"], "best_match": compact(c.get("best_match")),
+                "results": [compact(r) for r in c["results"]],
+            }
+            for c in group["campaigns"]
+        ],
+    }
+
+
+def _frame(messages: list[str]) -> str:
+    """One message as-is, several as a batch frame."""
+    if len(messages) == 1:
+        return messages[0]
+    metrics["batches"] += 1
+    return '{"type": "batch", "messages": [' + ", ".join(messages) + "]}"
+
+
+def _flush(room_id: str):
+    messages = _pending.pop(room_id, None)
+    if messages:
+        _send(room_id, messages)
+
+
+def _send(room_id: str, messages: list[tuple[str, str]]):
+    """
+    Enqueue each client's frame — only the messages on topics it subscribed to, built
+    once per distinct subscription set and format. Each client's writer task does the actual send,
+    so one slow tab can't hold up the caller or the other clients. A client whose
+    queue is full is disconnected.
+    """
+    frames: dict[tuple[frozenset, bool], str | bytes | None] = {}
+    for client in list(active_connections.get(room_id, [])):
+        key = (frozenset(client.topics), client.binary)
+        if key not in frames:
+            selected = [msg for topic, msg in messages if client.wants(topic)]
+            frame = _frame(selected) if selected else None
+            frames[key] = json_to_msgpack(frame) if frame and client.binary else frame
+        if frames[key] is None:
+            continue
+        if client.enqueue(frames[key]):
+            metrics["enqueued"] += 1
+            continue
+        logger.warning(f"🐢 Dropping slow WS client in {room_id} ({client.queue.qsize()} queued)")
+        metrics["slow_consumers_dropped"] += 1
+        _remove(client)
+        asyncio.create_task(client.close(SLOW_CONSUMER_CODE))
+
+
+def _escape(key) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def json_diff(old, new, path: str = "") -> list[dict]:
+    """
+    JSON-patch (RFC 6902) ops turning `old` into `new`. Lists are compared index by
+    index, so appends — growing transcripts — become single "add" ops.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [{"op": "remove", "path": f"{path}/{_escape(k)}"} for k in old if k not in new]
+        for k, v in new.items():
+            if k not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(k)}", "value": v})
+            else:
+                ops.extend(json_diff(old[k], v, f"{path}/{_escape(k)}"))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        for i in range(min(len(old), len(new))):
+            ops.extend(json_diff(old[i], new[i], f"{path}/{i}"))
+        ops.extend({"op": "add", "path": f"{path}/{i}", "value": new[i]} for i in range(len(old), len(new)))
+        # Remove from the end so earlier indices stay valid
+        ops.extend({"op": "remove", "path": f"{path}/{i}"} for i in range(len(old) - 1, len(new) - 1, -1))
+        return ops
+    if old != new or type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def _send_campaign_snapshot(client: Client):
+    client.campaign_version = campaign_snapshots[client.room_id]["version"]
+    client.enqueue(_snapshot_message(client.room_id))
+
+
+def _snapshot_message(room_id: str) -> str:
+    snap = campaign_snapshots[room_id]
+    return dumps_str({"type": "campaign_update", "version": snap["version"], "campaign": snap["campaign"]})
+
+
+async def broadcast_campaign(room_id: str, campaign: dict):
+    """
+    Broadcast a campaign's new state as a versioned delta. Clients get a full
+    `campaign_update` snapshot on connect (or on a `resync` request) and a
+    `campaign_patch` with only the changed paths for every mutation after that.
+    The diff is made here, on the worker running the campaign; the new state travels
+    with the patch so every worker's snapshot (and connect-time campaign_update) stays current.
+    """
+    state = loads(dumps_str(campaign))
+    snap = campaign_snapshots.get(room_id)
+    if snap is None:
+        campaign_snapshots[room_id] = {"version": 1, "campaign": state}
+        await pubsub.publish(room_id, {"campaign": state, "version": 1})
+        return
+
+    ops = json_diff(snap["campaign"], state)
+    if not ops:
+        return
+    version = snap["version"] + 1
+    # Set before any await so the next update diffs against this state
+    campaign_snapshots[room_id] = {"version": version, "campaign": state}
+    await pubsub.publish(room_id, {
+        "campaign": state, "version": version,
+        "event": {"type": "campaign_patch", "version": version, "base_version": version - 1, "ops": ops},
+    }, sequenced=True)
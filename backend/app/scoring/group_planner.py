@@ -0,0 +1,137 @@
+"""
+Incremental group planner — keeps a "Book My Whole Week" plan up to date while
+campaigns are still running. Each time a result in the group books or fails the
+plan is re-optimized, reusing the previous search state (parsed slot intervals
+and the last best plan as the starting incumbent), and pushed to the frontend
+as an `optimized_plan` WebSocket event. Bursts of changes are debounced into one
+re-plan, which is skipped if the bookable options didn't change, and a group's
+planner is dropped once its final plan is sent.
+"""
+import asyncio
+import logging
+
+from app.config import settings
+from app.scoring.optimizer import collect_options, optimize_options, option_key, options_date_range
+from app.tools.freebusy import load_busy_index
+
+logger = logging.getLogger(__name__)
+
+# Campaign statuses after which no more results will arrive
+DONE_STATUSES = {"completed", "error", "no_providers", "cancelled"}
+
+
+class GroupPlanner:
+    """Per-group search state reused across re-optimizations."""
+
+    def __init__(self, group_id: str):
+        self.group_id = group_id
+        self.parsed: dict = {}          # (date, time) → minute interval, shared by every SlotTable build
+        self.best_keys: set | None = None
+        self.busy = None                # BusyIndex of the user's calendar over busy_range
+        self.busy_range: tuple | None = None
+        self.last_sent: tuple | None = None
+        self.last_options: tuple | None = None  # Inputs of the last search — unchanged means skip
+        self.scheduled = False
+        self.running = False
+        self.dirty = False
+
+    async def refresh(self, group: dict):
+        """Re-optimize until no change arrived mid-search, then broadcast the plan."""
+        self.scheduled = False
+        if self.running:
+            self.dirty = True
+            return
+        self.running = True
+        try:
+            while True:
+                self.dirty = False
+                await self._optimize_once(group)
+                if not self.dirty:
+                    break
+        except Exception as e:
+            logger.warning(f"⚠️ Incremental optimization failed for {self.group_id}: {e}")
+        finally:
+            self.running = False
+
+    async def _optimize_once(self, group: dict):
+        from app.agents.swarm_orchestrator import distances, _broadcast
+
+        version = group.get("results_version", 0)
+        final = all(c.get("status") in DONE_STATUSES for c in group.get("campaigns", []))
+        options = collect_options(group, include_running=not final)
+        if not options:
+            if final:
+                planners.pop(self.group_id, None)
+            return
+
+        # Most version bumps (call status changes, transcripts) don't touch the options
+        signature = (final, tuple(tuple((option_key(o), o.get("score")) for o in opts) for opts in options))
+        if signature == self.last_options:
+            return
+        self.last_options = signature
+
+        ids = {o["provider_id"] for opts in options for o in opts if o["provider_id"]}
+        points = [
+            {"provider_id": p["provider_id"], "lat": p.get("lat", 0), "lng": p.get("lng", 0)}
+            for c in group["campaigns"] for p in c.get("providers", []) if p.get("provider_id") in ids
+        ]
+        drive_minutes = await distances.get_drive_times(points) if len(points) > 1 else {}
+
+        # Reload the user's busy blocks only when the plan's date range grows
+        date_range = options_date_range(options)
+        if date_range and (not self.busy_range or date_range[0] < self.busy_range[0]
+                           or date_range[1] > self.busy_range[1]):
+            from app.routes.tools import get_user_calendar
+            if self.busy_range:
+                date_range = (min(date_range[0], self.busy_range[0]), max(date_range[1], self.busy_range[1]))
+            self.busy = await load_busy_index(await get_user_calendar(group.get("user_id")), *date_range)
+            self.busy_range = date_range
+
+        # Thread, not process: the parsed-interval cache and incumbent live in this object
+        result = await asyncio.to_thread(
+            optimize_options, options, drive_minutes, 1, None, self.best_keys, self.parsed, self.busy
+        )
+
+        plan_keys = tuple(option_key(a) for a in result.get("appointments", []))
+        self.best_keys = set(plan_keys) if plan_keys else None
+        if final:
+            # No more results will arrive — the search state isn't needed after this
+            planners.pop(self.group_id, None)
+        elif plan_keys == self.last_sent:
+            return
+        self.last_sent = plan_keys
+
+        await _broadcast(self.group_id, {
+            "type": "optimized_plan",
+            "group_id": self.group_id,
+            "results_version": version,
+            "final": final,
+            "plan": result,
+        })
+        logger.info(f"🗓️ Plan for {self.group_id} updated (v{version}, final={final})")
+
+
+planners: dict[str, GroupPlanner] = {}
+
+
+def schedule_refresh(group: dict):
+    """
+    Queue an incremental re-optimization for a group. Changes within
+    settings.planner_debounce_ms share one; one arriving mid-search re-runs it after.
+    """
+    group_id = group["group_id"]
+    planner = planners.get(group_id)
+    if planner is None:
+        planner = planners[group_id] = GroupPlanner(group_id)
+    if planner.running:
+        planner.dirty = True
+        return
+    if planner.scheduled:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop (e.g. called from a worker thread) — the next change will trigger it
+        return
+    planner.scheduled = True
+    loop.call_later(settings.planner_debounce_ms / 1000, lambda: loop.create_task(planner.refresh(group)))
@@ -1,14 +1,30 @@
 """
 Multi-Appointment Optimizer — "Book My Whole Week"
 After all campaigns complete, finds the optimal combination of appointments
-that avoids time conflicts and minimizes total travel distance.
+that avoids time conflicts (including gaps too short to drive between
+providers) and minimizes total travel distance.
 """
+import asyncio
+import heapq
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from itertools import product
+
+import numpy as np
+
+from app.config import settings
+from app.tools.freebusy import BusyIndex
 
 logger = logging.getLogger(__name__)
 
+# Largest travel bonus a combination can earn — used as the optimistic bound in the search
+MAX_TRAVEL_BONUS = 0.2
+SLOT_MINUTES = 60
+EARTH_RADIUS_MILES = 3959
+FALLBACK_MPH = 25  # Drive-time estimate for provider pairs with no cached Distance Matrix value
+
 
 def parse_slot(slot: dict) -> tuple:
     """Parse a slot dict into (datetime_start, datetime_end)."""
@@ -41,32 +57,276 @@ def haversine_miles(lat1, lng1, lat2, lng2) -> float:
     return R * 2 * atan2(sqrt(a), sqrt(1-a))
 
 
-def optimize_appointments(campaign_group: dict) -> dict:
+def slot_interval(slot: dict) -> tuple:
+    """Parse a slot dict into integer (start, end) minutes since 0001-01-01, or None."""
+    start, _ = parse_slot(slot)
+    if not start:
+        return None
+    minute = start.toordinal() * 1440 + start.hour * 60 + start.minute
+    return minute, minute + SLOT_MINUTES
+
+
+def haversine_matrix(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Pairwise haversine distances in miles between all coordinates (vectorized)."""
+    lat_r, lng_r = np.radians(lat), np.radians(lng)
+    dlat = lat_r[:, None] - lat_r[None, :]
+    dlng = lng_r[:, None] - lng_r[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r)[:, None] * np.cos(lat_r)[None, :] * np.sin(dlng / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class SlotTable:
     """
-    Given a campaign group with multiple completed campaigns,
-    find the optimal set of appointments (one per service type)
-    that maximizes total score while avoiding time conflicts
-    and minimizing total travel.
+    Preprocessed view of every candidate option in a group.
+    Each distinct slot string is parsed once into integer minute intervals, then
+    the pairwise conflict and distance matrices are built with NumPy up front so
+    the search itself only does index lookups.
 
-    Returns:
-    {
-        "optimized": True,
-        "appointments": [{service_type, provider_name, date, time, score, lat, lng}, ...],
-        "total_score": float,
-        "total_travel_miles": float,
-        "conflicts_resolved": int,
-        "route_order": [indices in travel-optimized order]
-    }
+    drive_minutes maps (from_provider_id, to_provider_id) → cached driving minutes;
+    pairs without a value fall back to a haversine estimate at FALLBACK_MPH.
+    parsed is an optional {(date, time): interval} cache shared across tables so
+    repeated builds for the same group only parse slots they have not seen.
     """
-    campaigns = campaign_group.get("campaigns", [])
-    completed = [c for c in campaigns if c.get("status") == "completed"]
 
-    if not completed:
-        return {"optimized": False, "reason": "No completed campaigns"}
+    def __init__(self, options: list[dict], drive_minutes: dict | None = None, parsed: dict | None = None):
+        self.options = options
+        n = len(options)
+
+        parsed = {} if parsed is None else parsed
+        self.start = np.zeros(n, dtype=np.int64)
+        self.end = np.zeros(n, dtype=np.int64)
+        self.timed = np.zeros(n, dtype=bool)
+        for i, opt in enumerate(options):
+            slot = opt.get("slot") or {}
+            key = (slot.get("date"), slot.get("time"))
+            if key not in parsed:
+                parsed[key] = slot_interval(slot)
+            if parsed[key]:
+                self.start[i], self.end[i] = parsed[key]
+                self.timed[i] = True
+
+        lat = np.array([o.get("lat", 0) for o in options], dtype=np.float64)
+        lng = np.array([o.get("lng", 0) for o in options], dtype=np.float64)
+        self.distance = haversine_matrix(lat, lng)
+
+        # travel[i, j] = minutes to drive from option i's provider to option j's
+        self.travel = self.distance / FALLBACK_MPH * 60
+        if drive_minutes:
+            rows_by_provider: dict[str, list[int]] = {}
+            for i, opt in enumerate(options):
+                rows_by_provider.setdefault(opt.get("provider_id"), []).append(i)
+            for (a, b), minutes in drive_minutes.items():
+                for i in rows_by_provider.get(a, ()):
+                    for j in rows_by_provider.get(b, ()):
+                        self.travel[i, j] = minutes
+
+        # Two slots conflict if they overlap, or if i ends before j starts with too
+        # little gap to drive between them. Untimed slots never conflict.
+        both_timed = self.timed[:, None] & self.timed[None, :]
+        overlap = (self.start[:, None] < self.end[None, :]) & (self.start[None, :] < self.end[:, None])
+        gap = self.start[None, :] - self.end[:, None]
+        too_tight = (gap >= 0) & (gap < self.travel)
+        self.conflict = both_timed & (overlap | too_tight | too_tight.T)
+        np.fill_diagonal(self.conflict, False)
+
+        # Nested lists are much faster than NumPy scalar indexing inside a Python loop
+        self.conflict_rows = self.conflict.tolist()
+        self.distance_rows = self.distance.tolist()
+        self.start_minutes = self.start.tolist()
+        self.timed_flags = self.timed.tolist()
+        self.scores = [o["score"] for o in options]
+
+    def route(self, rows: list[int]) -> tuple[list[int], float]:
+        """
+        Minimum-travel visiting order for a conflict-free set of rows.
+        Returns (order, miles) with order as positions into rows.
+
+        Timed appointments must be visited chronologically, so when every slot
+        is timed the order is simply by start time. Untimed appointments can go
+        anywhere; then a Held-Karp DP over subsets (fine for the handful of
+        appointments in a plan) finds the cheapest order that keeps the timed
+        ones chronological.
+        """
+        dist = self.distance_rows
+        if all(self.timed_flags[r] for r in rows):
+            order = sorted(range(len(rows)), key=lambda k: self.start_minutes[rows[k]])
+            return order, sum(dist[rows[a]][rows[b]] for a, b in zip(order, order[1:]))
+
+        n = len(rows)
+        # must_follow[k] = bitmask of positions that have to be visited before k
+        must_follow = [0] * n
+        for a in range(n):
+            for b in range(n):
+                if (self.timed_flags[rows[a]] and self.timed_flags[rows[b]]
+                        and self.start_minutes[rows[a]] < self.start_minutes[rows[b]]):
+                    must_follow[b] |= 1 << a
+
+        full = (1 << n) - 1
+        # best[(mask, last)] = (miles, previous last)
+        best = {(1 << k, k): (0.0, None) for k in range(n) if must_follow[k] == 0}
+        for mask in range(1, full + 1):
+            for last in range(n):
+                state = best.get((mask, last))
+                if state is None:
+                    continue
+                for nxt in range(n):
+                    if mask & (1 << nxt) or must_follow[nxt] & ~mask:
+                        continue
+                    key = (mask | (1 << nxt), nxt)
+                    miles = state[0] + dist[rows[last]][rows[nxt]]
+                    if key not in best or miles < best[key][0]:
+                        best[key] = (miles, last)
+
+        last = min((k for k in range(n) if (full, k) in best), key=lambda k: best[(full, k)][0])
+        miles = best[(full, last)][0]
+        order, mask = [], full
+        while last is not None:
+            order.append(last)
+            prev = best[(mask, last)][1]
+            mask &= ~(1 << last)
+            last = prev
+        return order[::-1], miles
+
+
+def _travel_bonus(total_travel: float) -> float:
+    """Normalize travel bonus: less travel = higher bonus (30 miles normalization)."""
+    if total_travel > 0:
+        return max(0, MAX_TRAVEL_BONUS * (1 - total_travel / 30))
+    return 0
+
+
+class _OutOfTime(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+
+def option_key(opt: dict) -> tuple:
+    """Stable identity of an option across searches: (service_type, provider_id, date, time)."""
+    slot = opt.get("slot") or {}
+    return opt.get("service_type"), opt.get("provider_id"), slot.get("date"), slot.get("time")
+
+
+def _branch_and_bound(options_per_campaign: list[list[dict]], drive_minutes: dict | None = None,
+                      k: int = 1, deadline: float | None = None,
+                      seed: set | None = None, parsed: dict | None = None) -> tuple:
+    """
+    Depth-first search choosing one option per campaign, in campaign order.
+    Prunes a partial assignment as soon as it has a time conflict, or when even
+    the best remaining options plus the maximum travel bonus cannot beat the
+    k-th best plan found so far. Without a deadline, options are visited in the
+    same order as a full Cartesian product and only strict improvements are
+    accepted, so k=1 returns the same optimum (including tie-breaks) as
+    brute-force enumeration.
+
+    With a deadline (time.monotonic() value) the search is anytime: options are
+    tried best-score-first so good plans are found early, and whatever has been
+    found when time runs out is returned, flagged as not proven optimal.
+
+    The travel bonus is scored on the real visiting order (see SlotTable.route),
+    so it is only known once every campaign has an option.
+
+    seed is an optional set of option_key()s from a previous search (e.g. the
+    last best plan). If those options still form a complete conflict-free plan
+    it is scored up front, so pruning starts from a good incumbent.
+
+    Returns (plans, conflicts_checked, proven_optimal, table) where plans is a
+    best-first list of (total_score, rows).
+    """
+    # Placeholder entries (no booked options) can never be part of a valid combo
+    candidates = [[o for o in opts if o["provider_id"] is not None] for opts in options_per_campaign]
+    if any(not opts for opts in candidates):
+        return [], 0, True, None
+
+    table = SlotTable([o for opts in candidates for o in opts], drive_minutes, parsed)
+    levels, offset = [], 0
+    for opts in candidates:
+        levels.append(list(range(offset, offset + len(opts))))
+        offset += len(opts)
+
+    conflict, scores = table.conflict_rows, table.scores
+    if deadline is not None:
+        levels = [sorted(level, key=lambda j: -scores[j]) for level in levels]
+
+    # rest_max[i] = best achievable score sum from level i onwards
+    rest_max = [0.0] * (len(levels) + 1)
+    for i in range(len(levels) - 1, -1, -1):
+        rest_max[i] = rest_max[i + 1] + max(scores[j] for j in levels[i])
+
+    # Min-heap of the k best plans: (score, -found_order, rows). On equal scores the
+    # later-found plan is evicted first, so earlier plans win ties.
+    heap: list[tuple] = []
+    stats = {"conflicts": 0, "found": 0, "nodes": 0}
+    chosen: list[int] = []
+
+    def threshold() -> float:
+        return heap[0][0] if len(heap) >= k else -1
+
+    if seed:
+        seed_rows = [next((j for j in level if option_key(table.options[j]) in seed), None) for level in levels]
+        if None not in seed_rows and not any(conflict[a][b] for a in seed_rows for b in seed_rows):
+            _, travel = table.route(seed_rows)
+            heap.append((sum(scores[j] for j in seed_rows) + _travel_bonus(travel), 0, tuple(seed_rows)))
+
+    def visit(level: int, score: float):
+        if level == len(levels):
+            _, travel = table.route(chosen)
+            total_score = score + _travel_bonus(travel)
+            combo = tuple(chosen)
+            if total_score > threshold() and all(e[2] != combo for e in heap):
+                stats["found"] += 1
+                entry = (total_score, -stats["found"], combo)
+                if len(heap) >= k:
+                    heapq.heapreplace(heap, entry)
+                else:
+                    heapq.heappush(heap, entry)
+                # Out of time with a plan in hand — return it now rather than at the next node check
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise _OutOfTime()
+            return
+
+        stats["nodes"] += 1
+        if deadline is not None and stats["nodes"] % 256 == 0 and time.monotonic() >= deadline:
+            raise _OutOfTime()
+
+        # Bound: small epsilon guards against float summation-order differences
+        if score + rest_max[level] + MAX_TRAVEL_BONUS + 1e-9 <= threshold():
+            return
+
+        for j in levels[level]:
+            row = conflict[j]
+            if any(row[c] for c in chosen):
+                stats["conflicts"] += 1
+                continue
+            chosen.append(j)
+            visit(level + 1, score + scores[j])
+            chosen.pop()
+
+    proven_optimal = True
+    try:
+        # A seeded incumbent already answers an exhausted budget
+        if deadline is not None and heap and time.monotonic() >= deadline:
+            raise _OutOfTime()
+        visit(0, 0)
+    except _OutOfTime:
+        proven_optimal = False
+
+    plans = [(total, rows) for total, _, rows in sorted(heap, reverse=True)]
+    return plans, stats["conflicts"], proven_optimal, table
+
+
+def collect_options(campaign_group: dict, include_running: bool = False) -> list[list[dict]]:
+    """
+    Booked options per completed campaign (a single placeholder entry if a campaign has none).
+    With include_running, every campaign that already has booked options is included
+    and campaigns without any are skipped — used for interim plans while calls stream in.
+    """
+    campaigns = campaign_group.get("campaigns", [])
+    if include_running:
+        selected = [c for c in campaigns if c.get("status") != "cancelled"]
+    else:
+        selected = [c for c in campaigns if c.get("status") == "completed"]
 
-    # Collect booked results per campaign
     options_per_campaign = []
-    for camp in completed:
+    for camp in selected:
         booked = []
         for r in camp.get("results", []):
             if r.get("status") == "booked" and r.get("offered_slot"):
@@ -83,89 +343,181 @@ def optimize_appointments(campaign_group: dict) -> dict:
                 })
         if booked:
             options_per_campaign.append(booked)
-        else:
+        elif not include_running:
             # No booked options for this service type
             options_per_campaign.append([{
                 "service_type": camp["service_type"],
                 "provider_id": None, "provider_name": "No options",
                 "slot": {}, "score": 0, "lat": 0, "lng": 0, "distance_miles": 0,
             }])
+    return options_per_campaign
+
+
+def drop_busy_options(options_per_campaign: list[list[dict]], busy: BusyIndex) -> tuple[list[list[dict]], int]:
+    """
+    Remove options whose slot clashes with the user's existing calendar.
+    Each option is checked once against the interval index (O(log n)), so the
+    search never has to consider a calendar clash. Returns (options, removed).
+    """
+    removed, filtered = 0, []
+    for opts in options_per_campaign:
+        keep = []
+        for opt in opts:
+            interval = slot_interval(opt["slot"]) if opt["provider_id"] else None
+            if interval and busy.overlaps(*interval):
+                removed += 1
+                continue
+            keep.append(opt)
+        filtered.append(keep)
+    return filtered, removed
+
+
+def optimize_options(options_per_campaign: list[list[dict]], drive_minutes: dict | None = None,
+                     k: int = 1, time_budget_s: float | None = None,
+                     seed: set | None = None, parsed: dict | None = None,
+                     busy: BusyIndex | None = None) -> dict:
+    """
+    Run the plan search over pre-collected options. See optimize_appointments for
+    the result shape, and _branch_and_bound for seed/parsed.
+    """
+    started = time.monotonic()
+    # None = unlimited; 0 = stop at the first complete plan
+    deadline = started + time_budget_s if time_budget_s is not None else None
+
+    calendar_conflicts = 0
+    if busy:
+        options_per_campaign, calendar_conflicts = drop_busy_options(options_per_campaign, busy)
 
     if len(options_per_campaign) <= 1:
-        # Single campaign — just return best result
-        best = options_per_campaign[0][0] if options_per_campaign[0] else None
-        if best and best["provider_id"]:
-            return {
-                "optimized": True,
-                "appointments": [best],
-                "total_score": best["score"],
-                "total_travel_miles": best["distance_miles"],
-                "conflicts_resolved": 0,
-                "route_order": [0],
-            }
-        return {"optimized": False, "reason": "No bookable appointments found"}
-
-    # Try all combinations and pick the best conflict-free set
-    best_combo = None
-    best_total_score = -1
-    conflicts_checked = 0
-
-    for combo in product(*options_per_campaign):
-        # Skip combos with None provider
-        if any(c["provider_id"] is None for c in combo):
-            continue
-
-        # Check for time conflicts
-        has_conflict = False
-        for i in range(len(combo)):
-            for j in range(i + 1, len(combo)):
-                if slots_conflict(combo[i]["slot"], combo[j]["slot"]):
-                    has_conflict = True
-                    conflicts_checked += 1
-                    break
-            if has_conflict:
-                break
-
-        if has_conflict:
-            continue
-
-        # Score this combination: sum of individual scores + travel bonus
-        total_score = sum(c["score"] for c in combo)
-
-        # Add bonus for proximity between appointments
-        total_travel = 0
-        for i in range(len(combo) - 1):
-            d = haversine_miles(combo[i]["lat"], combo[i]["lng"], combo[i+1]["lat"], combo[i+1]["lng"])
-            total_travel += d
-        # Normalize travel bonus: less travel = higher bonus
-        if total_travel > 0:
-            travel_bonus = max(0, 0.2 * (1 - total_travel / 30))  # 30 miles normalization
-            total_score += travel_bonus
-
-        if total_score > best_total_score:
-            best_total_score = total_score
-            best_combo = combo
-
-    if not best_combo:
-        return {"optimized": False, "reason": "All combinations have time conflicts"}
-
-    # Compute route order (sort by appointment time)
-    appointments = list(best_combo)
-    appointments.sort(key=lambda a: a["slot"].get("date", "") + a["slot"].get("time", ""))
-
-    # Total travel in route order
-    total_travel = 0
-    for i in range(len(appointments) - 1):
-        total_travel += haversine_miles(
-            appointments[i]["lat"], appointments[i]["lng"],
-            appointments[i+1]["lat"], appointments[i+1]["lng"]
-        )
+        # Single campaign — just return the best results
+        booked = [o for o in options_per_campaign[0] if o["provider_id"]] if options_per_campaign else []
+        if not booked:
+            return {"optimized": False, "reason": "No bookable appointments found"}
+        plans = [{
+            "appointments": [opt],
+            "total_score": opt["score"],
+            "total_travel_miles": opt["distance_miles"],
+            "total_drive_minutes": 0,
+            "route_order": [0],
+        } for opt in booked[:k]]
+        return {"optimized": True, **plans[0], "conflicts_resolved": 0, "calendar_conflicts": calendar_conflicts,
+                "plans": plans, "proven_optimal": True, "search_ms": 0}
+
+    found, conflicts_checked, proven_optimal, table = _branch_and_bound(
+        options_per_campaign, drive_minutes, k, deadline, seed, parsed
+    )
+    search_ms = round((time.monotonic() - started) * 1000, 1)
+
+    if not found:
+        reason = ("All combinations have time conflicts" if proven_optimal
+                  else "No conflict-free plan found within the time budget")
+        return {"optimized": False, "reason": reason, "calendar_conflicts": calendar_conflicts,
+                "proven_optimal": proven_optimal, "search_ms": search_ms}
+
+    plans = []
+    for total_score, combo in found:
+        # Appointments listed by time; route_order gives the minimum-travel visiting order
+        rows = sorted(combo, key=lambda j: (table.start_minutes[j] if table.timed_flags[j] else float("inf")))
+        order, total_travel = table.route(rows)
+        drive = sum(table.travel[rows[a], rows[b]] for a, b in zip(order, order[1:]))
+        plans.append({
+            "appointments": [table.options[j] for j in rows],
+            "total_score": round(total_score, 3),
+            "total_travel_miles": round(total_travel, 1),
+            "total_drive_minutes": int(round(drive)),
+            "route_order": order,
+        })
 
     return {
         "optimized": True,
-        "appointments": appointments,
-        "total_score": round(best_total_score, 3),
-        "total_travel_miles": round(total_travel, 1),
+        **plans[0],
         "conflicts_resolved": conflicts_checked,
-        "route_order": list(range(len(appointments))),
-    }
\ No newline at end of file
+        "calendar_conflicts": calendar_conflicts,
+        "plans": plans,
+        "proven_optimal": proven_optimal,
+        "search_ms": search_ms,
+    }
+
+
+def optimize_appointments(campaign_group: dict, drive_minutes: dict | None = None,
+                          k: int = 1, time_budget_s: float | None = None,
+                          busy: BusyIndex | None = None) -> dict:
+    """
+    Given a campaign group with multiple completed campaigns,
+    find the optimal set of appointments (one per service type)
+    that maximizes total score while avoiding time conflicts
+    and minimizing total travel.
+
+    drive_minutes: optional {(from_provider_id, to_provider_id): minutes}, e.g. from
+    DistanceService.get_drive_times, used to reject gaps too short to drive.
+    k: number of distinct plans to return, best first.
+    time_budget_s: optional search budget (None = unlimited); when it runs out the best
+    plans found so far are returned with proven_optimal=False. 0 returns the first plan found.
+    busy: optional BusyIndex of the user's existing calendar; options that clash
+    with it are dropped before the search.
+
+    Returns:
+    {
+        "optimized": True,
+        "appointments": [{service_type, provider_name, date, time, score, lat, lng}, ...],
+        "total_score": float,
+        "total_travel_miles": float,
+        "total_drive_minutes": int,
+        "conflicts_resolved": int,
+        "calendar_conflicts": int,
+        "route_order": [indices into appointments in visiting order],
+        "plans": [{appointments, total_score, total_travel_miles, total_drive_minutes, route_order}, ...],
+        "proven_optimal": bool,
+        "search_ms": float
+    }
+    The top-level plan fields describe plans[0].
+    """
+    options_per_campaign = collect_options(campaign_group)
+    if not options_per_campaign:
+        return {"optimized": False, "reason": "No completed campaigns"}
+    return optimize_options(options_per_campaign, drive_minutes, k, time_budget_s, busy=busy)
+
+
+def options_date_range(options_per_campaign: list[list[dict]]) -> tuple[str, str] | None:
+    """(first, last) YYYY-MM-DD across all offered slots, or None if there are none."""
+    dates = sorted(o["slot"]["date"] for opts in options_per_campaign for o in opts if (o.get("slot") or {}).get("date"))
+    return (dates[0], dates[-1]) if dates else None
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Workers start from a clean interpreter rather than forking the event loop,
+        # threads and open sockets of the server process (spawn where forkserver is unavailable)
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(max_workers=settings.optimizer_workers,
+                                        mp_context=multiprocessing.get_context(method))
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the optimizer worker processes (called on app shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def optimize_in_worker(campaign_group: dict, drive_minutes: dict | None = None,
+                             k: int = 1, time_budget_s: float | None = None,
+                             busy: BusyIndex | None = None) -> dict:
+    """
+    Same as optimize_appointments, but the search runs in a worker process so a
+    large group never blocks the event loop. Only the compact option lists are
+    sent to the worker, not the whole group (transcripts and all).
+    """
+    options_per_campaign = collect_options(campaign_group)
+    if not options_per_campaign:
+        return {"optimized": False, "reason": "No completed campaigns"}
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), optimize_options, options_per_campaign, drive_minutes, k, time_budget_s, None, None, busy
+    )
@@ -2,25 +2,23 @@
 import logging
 from datetime import datetime
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Column order of the feature vectors kept for what-if re-ranking
+FEATURES = ("availability", "rating", "distance", "preference")
+DEFAULT_WEIGHTS = {"availability": 0.4, "rating": 0.3, "distance": 0.2, "preference": 0.1}
 
-def compute_score(
+
+def compute_features(
     result: dict,
     provider: dict,
-    preferences: dict,
     preferred_names: list[str],
     max_distance: float = 10.0,
     date_range_days: int = 7,
-) -> float:
-    """Compute final score for a provider after call completes."""
-    w = {
-        "availability": preferences.get("availability", 0.4),
-        "rating": preferences.get("rating", 0.3),
-        "distance": preferences.get("distance", 0.2),
-        "preference": preferences.get("preference", 0.1),
-    }
-
+) -> tuple[float, float, float, float]:
+    """Compute the weight-independent score components (availability, rating, distance, preference)."""
     # Availability: earlier slot = higher score
     slot = result.get("offered_slot", {})
     if slot and slot.get("date"):
@@ -44,6 +42,25 @@ def compute_score(
     is_preferred = provider.get("name", "").lower() in [n.lower() for n in preferred_names]
     preference_score = 1.0 if is_preferred else 0.0
 
+    return availability_score, rating_score, distance_score, preference_score
+
+
+def compute_score(
+    result: dict,
+    provider: dict,
+    preferences: dict,
+    preferred_names: list[str],
+    max_distance: float = 10.0,
+    date_range_days: int = 7,
+) -> float:
+    """Compute final score for a provider after call completes."""
+    w = {k: preferences.get(k, v) for k, v in DEFAULT_WEIGHTS.items()}
+
+    availability_score, rating_score, distance_score, preference_score = compute_features(
+        result, provider, preferred_names, max_distance, date_range_days
+    )
+    is_preferred = preference_score > 0
+
     total = (
         w["availability"] * availability_score +
         w["rating"] * rating_score +
@@ -72,4 +89,45 @@ def rank_results(results: list[dict], providers: list[dict], preferences: dict,
             result["score"] = 0.0
 
     results.sort(key=lambda r: r.get("score", 0), reverse=True)
-    return results
\ No newline at end of file
+    return results
+
+
+def build_feature_matrix(results: list[dict], providers: list[dict], preferred_names: list[str],
+                         max_distance: float = 10.0) -> dict:
+    """
+    Snapshot the score components of every result as a compact (n, 4) float array.
+    Non-booked results keep a zero row and are masked out so they always score 0.
+    """
+    by_id = {p.get("provider_id"): p for p in providers}
+    features = np.zeros((len(results), len(FEATURES)), dtype=np.float64)
+    booked = np.zeros(len(results), dtype=bool)
+
+    for i, result in enumerate(results):
+        if result.get("status") == "booked":
+            prov = by_id.get(result.get("provider_id"), {})
+            features[i] = compute_features(result, prov, preferred_names, max_distance)
+            booked[i] = True
+
+    return {
+        "provider_ids": [r.get("provider_id") for r in results],
+        "features": features,
+        "booked": booked,
+    }
+
+
+def rerank_features(feature_matrix: dict, preferences: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apply a new set of weights to a cached feature matrix in one vectorized pass.
+    Returns (order, scores): row indices best-first and the rounded score of each row.
+    """
+    w = np.array([preferences.get(k, DEFAULT_WEIGHTS[k]) for k in FEATURES], dtype=np.float64)
+    features = feature_matrix["features"]
+
+    totals = features @ w
+    preferred = features[:, FEATURES.index("preference")] > 0
+    totals = np.where(preferred, np.minimum(totals * 1.5, 1.0), totals)
+    scores = np.round(np.where(feature_matrix["booked"], totals, 0.0), 3)
+
+    # Stable sort keeps the original order among ties, same as rank_results
+    order = np.argsort(-scores, kind="stable")
+    return order, scores
@@ -0,0 +1,140 @@
+"""
+Google OAuth access-token cache shared by everything that calls Google on a
+user's behalf. Tokens are kept with their expiry and refreshed shortly before
+they lapse — in the background for recently active users — and concurrent
+refreshes for the same user share a single request.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+
+class GoogleTokenManager:
+    def __init__(self):
+        # user_id → {"access_token", "refresh_token", "expires_at" (epoch s or None), "last_used"}
+        self.tokens: dict[str, dict] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+
+    def store(self, user_id: str, access_token: str, expires_at: Optional[float],
+              refresh_token: Optional[str] = None):
+        """Cache a token (e.g. fresh from the OAuth code exchange) and schedule its refresh."""
+        entry = self.tokens.setdefault(user_id, {"refresh_token": None, "last_used": time.time()})
+        entry["access_token"] = access_token
+        entry["expires_at"] = expires_at
+        if refresh_token:
+            entry["refresh_token"] = refresh_token
+        self._schedule(user_id)
+
+    def _load(self, user: dict) -> dict:
+        """
+        Seed the cache from a user record. A record with no tokens (or a bare {"id"} when
+        the user lookup failed) is not cached, so the next call looks the user up again.
+        """
+        expires_at = user.get("google_token_expires_at")
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
+        entry = {
+            "access_token": user.get("google_access_token"),
+            "refresh_token": user.get("google_refresh_token"),
+            "expires_at": expires_at,
+            "last_used": time.time(),
+        }
+        if entry["access_token"] or entry["refresh_token"]:
+            self.tokens[user["id"]] = entry
+        return entry
+
+    def _fresh(self, entry: dict) -> bool:
+        return bool(entry.get("access_token")) and entry.get("expires_at") is not None \
+            and entry["expires_at"] - time.time() > 60
+
+    async def get_access_token(self, user: dict) -> Optional[str]:
+        """A valid access token for the user, refreshing only if it is about to expire."""
+        entry = self.tokens.get(user["id"]) or self._load(user)
+        entry["last_used"] = time.time()
+        if self._fresh(entry):
+            return entry["access_token"]
+        # Unknown expiry (record predates expiry tracking) or expiring — refresh now if we can
+        if entry.get("refresh_token"):
+            token = await self.refresh(user["id"])
+            if token:
+                return token
+        return entry.get("access_token")
+
+    async def refresh(self, user_id: str) -> Optional[str]:
+        """Refresh the user's token; concurrent callers await the same request."""
+        task = self._refreshing.get(user_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._refresh(user_id))
+            self._refreshing[user_id] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def _refresh(self, user_id: str) -> Optional[str]:
+        entry = self.tokens.get(user_id)
+        if not entry or not entry.get("refresh_token"):
+            return None
+
+        logger.info(f"🔄 Refreshing Google token for {user_id}")
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                res = await client.post(TOKEN_URL, data={
+                    "client_id": settings.google_oauth_client_id,
+                    "client_secret": settings.google_oauth_client_secret,
+                    "refresh_token": entry["refresh_token"],
+                    "grant_type": "refresh_token",
+                })
+        except httpx.RequestError as e:
+            logger.error(f"❌ Token refresh error: {e}")
+            return None
+        if res.status_code != 200:
+            logger.error(f"❌ Failed to refresh token: {res.text}")
+            return None
+
+        tokens = res.json()
+        expires_at = time.time() + tokens.get("expires_in", 3600)
+        self.store(user_id, tokens["access_token"], expires_at, tokens.get("refresh_token"))
+
+        # Persist so other instances and restarts start from the new token
+        try:
+            from app.database import update_user
+            await update_user(user_id, {
+                "google_access_token": tokens["access_token"],
+                "google_token_expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ Could not persist refreshed token: {e}")
+        return tokens["access_token"]
+
+    def _schedule(self, user_id: str):
+        """Refresh ahead of expiry, as long as the user has been active recently."""
+        if timer := self._timers.pop(user_id, None):
+            timer.cancel()
+        entry = self.tokens[user_id]
+        if entry.get("expires_at") is None or not entry.get("refresh_token"):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        delay = max(0, entry["expires_at"] - time.time() - settings.google_token_refresh_margin_seconds)
+        self._timers[user_id] = loop.call_later(delay, self._proactive_refresh, user_id)
+
+    def _proactive_refresh(self, user_id: str):
+        self._timers.pop(user_id, None)
+        entry = self.tokens.get(user_id)
+        if entry and time.time() - entry["last_used"] < settings.google_token_idle_seconds:
+            asyncio.get_running_loop().create_task(self.refresh(user_id))
+
+
+google_tokens = GoogleTokenManager()
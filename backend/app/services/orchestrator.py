@@ -7,7 +7,7 @@ import asyncio
 from typing import Dict
 from datetime import datetime
 
-from app.routes.ws import broadcast
+from app.routes.ws import broadcast, broadcast_campaign
 from app.routes.providers import search_providers
 from app.services.elevenlabs_service import trigger_call
 from app.config import settings
@@ -119,11 +119,8 @@ async def run_campaign_swarm(
                 
             campaigns_db[campaign_id]["calls"] = initial_calls
             
-            # Broadcast full update
-            await broadcast(campaign_id, {
-                "type": "campaign_update",
-                "campaign": campaigns_db[campaign_id]
-            })
+            # Broadcast update (delta against the last snapshot)
+            await broadcast_campaign(campaign_id, campaigns_db[campaign_id])
 
         # 2. Dispatch Agents (Parallel Calls)
         tasks = []
@@ -237,12 +234,9 @@ async def dispatch_call(
             "reason": str(e)
         })
         
-    # Broadcast full campaign update
+    # Broadcast campaign update (delta against the last snapshot)
     if campaign_id in campaigns_db:
-        await broadcast(campaign_id, {
-            "type": "campaign_update", 
-            "campaign": campaigns_db[campaign_id]
-        })
+        await broadcast_campaign(campaign_id, campaigns_db[campaign_id])
 
 
 def get_campaign_by_conversation(conversation_id: str) -> Dict | None:
@@ -0,0 +1,136 @@
+"""
+Pub/sub backends for WebSocket fan-out. Broadcasts are published here and every
+worker's subscriber hands them to the clients connected to that worker, so an
+event raised in one uvicorn worker reaches browsers connected to any of them.
+
+Sequenced publishes are numbered by the backend as they are published, so every
+worker receives, buffers and replays a room's events under the same (epoch, seq),
+in seq order, and a client can reconnect to any worker.
+
+InMemoryPubSub (the default) delivers in-process — right for a single worker.
+RedisPubSub works with Redis or anything speaking its pub/sub protocol
+(Valkey, KeyDB, Dragonfly); set WS_PUBSUB_URL to use it.
+"""
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from app.config import settings
+from app.encoding import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# (room_id, payload) → deliver to this worker's clients
+Handler = Callable[[str, dict], Awaitable[None]]
+
+# Idle rooms' counters expire together; the next event starts a new epoch
+SEQUENCE_TTL_SECONDS = 86400
+
+# Number and publish in one step so seq order is delivery order across workers.
+# Splices "epoch"/"seq" into the front of the encoded payload object.
+PUBLISH_SEQUENCED = """
+redis.call('SET', KEYS[1], ARGV[2], 'NX')
+local seq = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+local epoch = redis.call('GET', KEYS[1])
+local message = '{"epoch":"' .. epoch .. '","seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+return redis.call('PUBLISH', KEYS[3], message)
+"""
+
+
+def new_epoch() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+class InMemoryPubSub:
+    def __init__(self, handler: Handler):
+        self._handler = handler
+        self._sequences: dict[str, list] = {}  # room_id → [epoch, seq]
+
+    async def start(self):
+        pass
+
+    async def publish(self, room_id: str, payload: dict, sequenced: bool = False):
+        """sequenced: deliver with the room's next "epoch"/"seq" added."""
+        if sequenced:
+            entry = self._sequences.setdefault(room_id, [new_epoch(), 0])
+            entry[1] += 1
+            payload = {"epoch": entry[0], "seq": entry[1], **payload}
+        await self._handler(room_id, payload)
+
+    async def stop(self):
+        pass
+
+
+class RedisPubSub:
+    """One pattern subscription per worker on `<channel>:*`; rooms are channel suffixes."""
+
+    def __init__(self, handler: Handler, url: str, channel: str):
+        self._handler = handler
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._redis is not None:
+            return
+        import redis.asyncio as redis  # Only needed for multi-worker deployments
+        self._redis = redis.from_url(self.url)
+        self._publish_sequenced = self._redis.register_script(PUBLISH_SEQUENCED)
+        self._reader = asyncio.get_running_loop().create_task(self._read())
+        logger.info(f"📡 WS pub/sub on {self.url} ({self.channel}:*)")
+
+    async def publish(self, room_id: str, payload: dict, sequenced: bool = False):
+        """sequenced: deliver with the room's next "epoch"/"seq" — one counter shared by all workers."""
+        if self._redis is None:
+            await self.start()
+        channel = f"{self.channel}:{room_id}"
+        if not sequenced:
+            await self._redis.publish(channel, dumps(payload))
+            return
+        keys = [f"{self.channel}:epoch:{room_id}", f"{self.channel}:seq:{room_id}", channel]
+        await self._publish_sequenced(keys=keys, args=[dumps(payload), new_epoch(), SEQUENCE_TTL_SECONDS])
+
+    async def _read(self):
+        prefix = len(self.channel) + 1
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{self.channel}:*")
+                async for msg in pubsub.listen():
+                    if msg["type"] != "pmessage":
+                        continue
+                    channel = msg["channel"]
+                    room_id = (channel.decode() if isinstance(channel, bytes) else channel)[prefix:]
+                    try:
+                        await self._handler(room_id, loads(msg["data"]))
+                    except Exception as e:
+                        logger.warning(f"⚠️ WS pub/sub delivery failed for {room_id}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Events published while disconnected are lost; clients catch up via replay/snapshot
+                logger.warning(f"⚠️ WS pub/sub connection lost, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            self._reader = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+def create_pubsub(handler: Handler):
+    if settings.ws_pubsub_url:
+        return RedisPubSub(handler, settings.ws_pubsub_url, settings.ws_pubsub_channel)
+    return InMemoryPubSub(handler)
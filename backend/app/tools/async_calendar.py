@@ -0,0 +1,88 @@
+"""
+Async adapter for CalendarService.
+The Google client is synchronous (`.execute()` blocks on HTTP), so every call is
+run on a dedicated, bounded thread pool instead of the event loop. Per-method
+latency metrics are kept for the /api/calendar/metrics endpoint.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.calendar_max_workers, thread_name_prefix="calendar")
+    return _executor
+
+
+class CalendarMetrics:
+    """Per-method call counts, errors and latency (ms)."""
+
+    def __init__(self):
+        self.methods: dict[str, dict] = {}
+
+    def record(self, method: str, elapsed_ms: float, ok: bool):
+        m = self.methods.setdefault(method, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+        m["calls"] += 1
+        m["errors"] += 0 if ok else 1
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+        m["last_ms"] = elapsed_ms
+
+    def snapshot(self) -> dict:
+        return {
+            name: {**m, "avg_ms": round(m["total_ms"] / m["calls"], 1) if m["calls"] else 0.0}
+            for name, m in self.methods.items()
+        }
+
+
+metrics = CalendarMetrics()
+
+
+class AsyncCalendarService:
+    """Same method surface as CalendarService, but awaitable and off the event loop."""
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    async def _call(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await loop.run_in_executor(
+                _get_executor(), partial(getattr(self.calendar, method), *args, **kwargs)
+            )
+            ok = True
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            metrics.record(method, elapsed_ms, ok)
+            logger.debug(f"📅 Calendar {method}: {elapsed_ms:.0f}ms ok={ok}")
+
+    async def get_events(self, start_date: str, end_date: str) -> list[dict]:
+        return await self._call("get_events", start_date, end_date)
+
+    async def get_busy(self, start_date: str, end_date: str, include_own: bool = False) -> list[tuple]:
+        return await self._call("get_busy", start_date, end_date, include_own=include_own)
+
+    async def check_availability(self, date_str: str, time_str: str, duration_minutes: int = 60) -> bool:
+        return await self._call("check_availability", date_str, time_str, duration_minutes)
+
+    async def create_event(self, summary: str, date_str: str, time_str: str,
+                           duration_minutes: int = 60, description: str = "") -> Optional[str]:
+        return await self._call("create_event", summary, date_str, time_str,
+                                duration_minutes=duration_minutes, description=description)
+
+    async def create_events(self, events: list[dict]) -> list:
+        return await self._call("create_events", events)
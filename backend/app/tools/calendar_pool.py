@@ -0,0 +1,63 @@
+"""
+Per-user calendar clients — a bounded LRU of AsyncCalendarService instances built
+from each user's stored Google tokens. Clients idle longer than
+settings.calendar_pool_idle_seconds are evicted.
+"""
+import logging
+import time
+from collections import OrderedDict
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarPool:
+    def __init__(self):
+        self.clients: OrderedDict[str, dict] = OrderedDict()  # user_id → {"calendar", "last_used"}
+
+    def _evict(self):
+        cutoff = time.monotonic() - settings.calendar_pool_idle_seconds
+        for user_id in [u for u, c in self.clients.items() if c["last_used"] < cutoff]:
+            del self.clients[user_id]
+            logger.info(f"🧹 Evicted idle calendar client for {user_id}")
+        while len(self.clients) > settings.calendar_pool_size:
+            user_id, _ = self.clients.popitem(last=False)
+            logger.info(f"🧹 Evicted LRU calendar client for {user_id}")
+
+    async def get(self, user_id: str):
+        """The user's calendar client, or None if they have no Google tokens."""
+        from app.services.google_tokens import google_tokens
+
+        user = {"id": user_id}
+        cached = google_tokens.tokens.get(user_id) or {}
+        if not (cached.get("access_token") or cached.get("refresh_token")):
+            from app import database as db
+            try:
+                user = await db.get_user_by_id(user_id) or user
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load user {user_id}: {e}")
+        access_token = await google_tokens.get_access_token(user)
+        if not access_token:
+            return None
+
+        entry = self.clients.get(user_id)
+        if entry is None:
+            from app.tools.calendar_tool import CalendarService
+            from app.tools.async_calendar import AsyncCalendarService
+            refresh_token = google_tokens.tokens.get(user_id, {}).get("refresh_token")
+            entry = self.clients[user_id] = {
+                "calendar": AsyncCalendarService(CalendarService.for_user(access_token, refresh_token)),
+            }
+            logger.info(f"📅 Calendar client created for {user_id}")
+        else:
+            # The token manager refreshes ahead of expiry; hand the client the current token
+            entry["calendar"].calendar.creds.token = access_token
+
+        entry["last_used"] = time.monotonic()
+        self.clients.move_to_end(user_id)
+        self._evict()
+        return entry["calendar"]
+
+
+calendar_pool = CalendarPool()
@@ -0,0 +1,107 @@
+"""
+Background calendar sync — confirmed bookings are queued here instead of creating
+their Google Calendar event inline, so the agent's tool call returns immediately.
+A worker drains the queue into Google batch requests, retries failures with
+backoff, and patches the event ID into the in-memory booking and its DB row.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Google rejects batches larger than this
+MAX_BATCH = 50
+
+
+class CalendarSyncQueue:
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def enqueue(self, user_id: str, booking: dict, event: dict, db_booking_id: Optional[str] = None):
+        """
+        Queue an event for creation on the user's calendar. `event` takes CalendarService.create_event's
+        keyword arguments; `booking` is the in-memory record whose calendar_event_id gets patched.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        self._queue.put_nowait({
+            "user_id": user_id, "booking": booking, "event": event,
+            "db_booking_id": db_booking_id, "attempt": 0,
+        })
+
+    async def _next_batch(self) -> list[dict]:
+        """Block for one job, then collect whatever else arrives within the linger window."""
+        batch = [await self._queue.get()]
+        size = min(settings.calendar_sync_batch_size, MAX_BATCH)
+        deadline = asyncio.get_running_loop().time() + settings.calendar_sync_linger_ms / 1000
+        while len(batch) < size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            jobs = await self._next_batch()
+            # One batch request per user — each goes to that user's own calendar
+            by_user: dict[str, list[dict]] = {}
+            for job in jobs:
+                by_user.setdefault(job["user_id"], []).append(job)
+            for user_id, user_jobs in by_user.items():
+                await self._sync_user(user_id, user_jobs)
+
+    async def _sync_user(self, user_id: str, jobs: list[dict]):
+        from app.routes.tools import get_user_calendar
+        try:
+            cal = await get_user_calendar(user_id)
+        except Exception as e:
+            cal, error = None, e
+        else:
+            error = RuntimeError("Calendar not available")
+        if not cal:
+            for job in jobs:
+                self._retry(job, error)
+            return
+
+        try:
+            results = await cal.create_events([j["event"] for j in jobs])
+        except Exception as e:
+            results = [e] * len(jobs)
+
+        for job, result in zip(jobs, results):
+            if isinstance(result, str):
+                await self._patch(job, result)
+            else:
+                self._retry(job, result)
+
+    async def _patch(self, job: dict, event_id: str):
+        from app import database as db
+        job["booking"]["calendar_event_id"] = event_id
+        logger.info(f"📆 Calendar event synced: {event_id} ({job['booking'].get('provider_name')})")
+        if job["db_booking_id"]:
+            try:
+                await db.update_booking(job["db_booking_id"], {"calendar_event_id": event_id})
+            except Exception as e:
+                logger.warning(f"⚠️ DB calendar_event_id update failed: {e}")
+
+    def _retry(self, job: dict, error):
+        job["attempt"] += 1
+        if isinstance(error, ValueError) or job["attempt"] > settings.calendar_sync_max_retries:
+            logger.error(f"❌ Calendar sync gave up on {job['booking'].get('provider_name')}: {error}")
+            return
+        delay = 2 ** job["attempt"]
+        logger.warning(f"⚠️ Calendar sync failed ({error}), retry {job['attempt']} in {delay}s")
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job)
+
+
+calendar_sync = CalendarSyncQueue()
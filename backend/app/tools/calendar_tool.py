@@ -9,27 +9,76 @@ Setup:
 4. First run will open browser for OAuth consent → creates token.json
 """
 import os
+import json
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Optional
+from zoneinfo import ZoneInfo
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request as GoogleAuthRequest
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+import google_auth_httplib2
+import httplib2
 
 from app.config import settings
+from app.tools.freebusy import CALLPILOT_MARKER, day_start
 
 logger = logging.getLogger(__name__)
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 TOKEN_PATH = "credentials/token.json"
 
+_discovery_doc: Optional[dict] = None
+
+
+def _build_service(creds):
+    """
+    Calendar API client from the discovery document bundled with googleapiclient,
+    parsed once per process — no discovery fetch per client.
+    """
+    global _discovery_doc
+    if _discovery_doc is None:
+        doc = discovery_cache.get_static_doc("calendar", "v3")
+        _discovery_doc = json.loads(doc) if doc else {}
+    if _discovery_doc:
+        return build_from_document(_discovery_doc, credentials=creds)
+    return build("calendar", "v3", credentials=creds, cache_discovery=False)
+
 
 class CalendarService:
-    def __init__(self):
+    def __init__(self, creds: Optional[Credentials] = None):
         self.service = None
-        self._authenticate()
+        self.creds = None
+        self._local = threading.local()
+        if creds is None:
+            self._authenticate()
+        else:
+            self.creds = creds
+            self.service = _build_service(creds)
+
+    @classmethod
+    def for_user(cls, access_token: str, refresh_token: Optional[str] = None) -> "CalendarService":
+        """Client acting on a signed-in user's own calendar, from their stored OAuth tokens."""
+        return cls(Credentials(
+            token=access_token, refresh_token=refresh_token,
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id=settings.google_oauth_client_id,
+            client_secret=settings.google_oauth_client_secret,
+            scopes=SCOPES,
+        ))
+
+    def _http(self):
+        """
+        Per-thread authorized transport. httplib2 is not thread-safe, so calls
+        running concurrently in the async adapter's thread pool each get their own.
+        """
+        if getattr(self._local, "http", None) is None:
+            self._local.http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+        return self._local.http
 
     def _authenticate(self):
         """Authenticate with Google Calendar API using OAuth 2.0."""
@@ -72,7 +121,8 @@ class CalendarService:
                     token_file.write(creds.to_json())
                 logger.info("✅ Google Calendar token saved.")
 
-        self.service = build("calendar", "v3", credentials=creds)
+        self.creds = creds
+        self.service = _build_service(creds)
         logger.info("✅ Google Calendar service initialized.")
 
     def get_events(self, start_date: str, end_date: str) -> list[dict]:
@@ -81,15 +131,14 @@ class CalendarService:
             logger.warning("⚠️ Calendar not connected — returning empty events")
             return []
         try:
-            start = datetime.strptime(start_date, "%Y-%m-%d").isoformat() + "Z"
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-            end = end_dt.isoformat() + "Z"
+            start = day_start(start_date)
+            end = day_start((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
 
             result = self.service.events().list(
                 calendarId="primary",
                 timeMin=start, timeMax=end,
                 singleEvents=True, orderBy="startTime"
-            ).execute()
+            ).execute(http=self._http())
 
             events = []
             for e in result.get("items", []):
@@ -106,6 +155,44 @@ class CalendarService:
             logger.error(f"❌ Get events error: {e}")
             return []
 
+    def get_busy(self, start_date: str, end_date: str,
+                 include_own: bool = False) -> list[tuple[datetime, datetime]]:
+        """
+        Get the user's busy (start, end) datetimes between two dates (YYYY-MM-DD, inclusive)
+        in a single query. Transparent events are skipped, as are events CallPilot
+        created unless include_own is set.
+        """
+        if not self.service:
+            logger.warning("⚠️ Calendar not connected — no busy intervals")
+            return []
+        # Whole local days — with a "Z" bound, late events on the last day would be missed
+        start = day_start(start_date)
+        end = day_start((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
+
+        busy, page_token = [], None
+        while True:
+            result = self.service.events().list(
+                calendarId="primary", timeMin=start, timeMax=end,
+                singleEvents=True, orderBy="startTime", timeZone=settings.calendar_timezone,
+                pageToken=page_token,
+            ).execute(http=self._http())
+            for e in result.get("items", []):
+                if e.get("transparency") == "transparent" or e.get("status") == "cancelled":
+                    continue
+                if not include_own and (e.get("description") or "").startswith(CALLPILOT_MARKER):
+                    continue
+                s, en = e.get("start", {}), e.get("end", {})
+                if "dateTime" in s:
+                    busy.append((datetime.fromisoformat(s["dateTime"]), datetime.fromisoformat(en["dateTime"])))
+                elif "date" in s:
+                    busy.append((datetime.strptime(s["date"], "%Y-%m-%d"), datetime.strptime(en["date"], "%Y-%m-%d")))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+
+        logger.info(f"📅 Loaded {len(busy)} busy blocks from {start_date} to {end_date}")
+        return busy
+
     def check_availability(self, date_str: str, time_str: str,
                            duration_minutes: int = 60) -> bool:
         """
@@ -113,17 +200,18 @@ class CalendarService:
         Returns True if available, False if there's a conflict.
         """
         try:
-            start_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+            start_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M").replace(
+                tzinfo=ZoneInfo(settings.calendar_timezone))
             end_dt = start_dt + timedelta(minutes=duration_minutes)
 
             # Query Google Calendar for events in this time range
             events_result = self.service.events().list(
                 calendarId="primary",
-                timeMin=start_dt.isoformat() + "Z",
-                timeMax=end_dt.isoformat() + "Z",
+                timeMin=start_dt.isoformat(),
+                timeMax=end_dt.isoformat(),
                 singleEvents=True,
                 orderBy="startTime"
-            ).execute()
+            ).execute(http=self._http())
 
             events = events_result.get("items", [])
 
@@ -142,6 +230,30 @@ class CalendarService:
             logger.error(f"❌ Calendar API error: {e}")
             raise
 
+    @staticmethod
+    def _event_body(summary: str, date_str: str, time_str: str,
+                    duration_minutes: int = 60, description: str = "") -> dict:
+        start_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+        end_dt = start_dt + timedelta(minutes=duration_minutes)
+        return {
+            "summary": summary,
+            "description": description,
+            "start": {
+                "dateTime": start_dt.isoformat(),
+                "timeZone": settings.calendar_timezone,
+            },
+            "end": {
+                "dateTime": end_dt.isoformat(),
+                "timeZone": settings.calendar_timezone,
+            },
+            "reminders": {
+                "useDefault": False,
+                "overrides": [
+                    {"method": "popup", "minutes": 30},
+                ],
+            },
+        }
+
     def create_event(self, summary: str, date_str: str, time_str: str,
                      duration_minutes: int = 60,
                      description: str = "") -> Optional[str]:
@@ -149,31 +261,11 @@ class CalendarService:
         Create a Google Calendar event. Returns the event ID.
         """
         try:
-            start_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-            end_dt = start_dt + timedelta(minutes=duration_minutes)
-
-            event = {
-                "summary": summary,
-                "description": description,
-                "start": {
-                    "dateTime": start_dt.isoformat(),
-                    "timeZone": "America/New_York",  # Adjust to your timezone
-                },
-                "end": {
-                    "dateTime": end_dt.isoformat(),
-                    "timeZone": "America/New_York",
-                },
-                "reminders": {
-                    "useDefault": False,
-                    "overrides": [
-                        {"method": "popup", "minutes": 30},
-                    ],
-                },
-            }
+            event = self._event_body(summary, date_str, time_str, duration_minutes, description)
 
             created_event = self.service.events().insert(
                 calendarId="primary", body=event
-            ).execute()
+            ).execute(http=self._http())
 
             event_id = created_event.get("id")
             event_link = created_event.get("htmlLink")
@@ -185,4 +277,28 @@ class CalendarService:
             raise
         except Exception as e:
             logger.error(f"❌ Calendar create error: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def create_events(self, events: list[dict]) -> list:
+        """
+        Create several events in one batch HTTP request. Each item takes create_event's
+        keyword arguments; returns, in order, the event ID or the Exception for that item.
+        """
+        results: list = [None] * len(events)
+
+        def on_response(request_id, response, exception):
+            results[int(request_id)] = exception if exception is not None else response.get("id")
+
+        batch = self.service.new_batch_http_request(callback=on_response)
+        for i, e in enumerate(events):
+            try:
+                body = self._event_body(**e)
+            except ValueError as err:
+                results[i] = err
+                continue
+            batch.add(self.service.events().insert(calendarId="primary", body=body), request_id=str(i))
+        batch.execute(http=self._http())
+
+        created = sum(1 for r in results if isinstance(r, str))
+        logger.info(f"📆 Batch created {created}/{len(events)} events")
+        return results
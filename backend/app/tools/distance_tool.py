@@ -1,14 +1,26 @@
 """Google Distance Matrix API — travel time calculations."""
 import httpx
 import logging
+import math
+import time
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+# Distance Matrix allows at most 100 elements (origins x destinations) per request,
+# and at most 25 origins and 25 destinations
+MAX_MATRIX_ELEMENTS = 100
+MAX_MATRIX_SIDE = 25
+# Pairs the API could not route are retried after this long
+FAILED_PAIR_TTL_SECONDS = 600
+
+
 class DistanceService:
     def __init__(self):
         self.key = settings.google_maps_api_key
+        self._drive_minutes: dict[tuple[str, str], int] = {}  # (from_id, to_id) → minutes
+        self._failed_pairs: dict[tuple[str, str], float] = {}  # (from_id, to_id) → retry after (monotonic)
 
     async def get_distances(self, origin_lat: float, origin_lng: float, destinations: list[dict]) -> dict:
         """
@@ -53,4 +65,90 @@ class DistanceService:
             return results
         except Exception as e:
             logger.error(f"❌ Distance Matrix error: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+    async def get_drive_times(self, points: list[dict]) -> dict:
+        """
+        Get driving minutes between every ordered pair of points.
+        points: [{lat, lng, provider_id}]
+        Returns: {(from_provider_id, to_provider_id): duration_minutes}
+        Pairs are cached for the life of the service, so only missing pairs hit the API;
+        pairs that fail are skipped for FAILED_PAIR_TTL_SECONDS before being retried.
+        """
+        points = list({p["provider_id"]: p for p in points if p.get("provider_id")}.values())
+        now = time.monotonic()
+        for pair in [p for p, retry_at in self._failed_pairs.items() if retry_at <= now]:
+            del self._failed_pairs[pair]
+        wanted: dict[str, list[dict]] = {}  # origin id → destinations still needed
+        for a in points:
+            for b in points:
+                pair = (a["provider_id"], b["provider_id"])
+                if pair[0] != pair[1] and pair not in self._drive_minutes and pair not in self._failed_pairs:
+                    wanted.setdefault(pair[0], []).append(b)
+
+        if wanted and self.key:
+            by_id = {p["provider_id"]: p for p in points}
+            url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+            requests = 0
+            async with httpx.AsyncClient(timeout=15) as c:
+                for block, dests in self._matrix_blocks([(by_id[pid], d) for pid, d in wanted.items()]):
+                    dest_step = min(MAX_MATRIX_SIDE, MAX_MATRIX_ELEMENTS // len(block))
+                    for j in range(0, len(dests), dest_step):
+                        chunk = dests[j:j + dest_step]
+                        requests += 1
+                        try:
+                            r = await c.get(url, params={
+                                "origins": "|".join(f"{o['lat']},{o['lng']}" for o in block),
+                                "destinations": "|".join(f"{d['lat']},{d['lng']}" for d in chunk),
+                                "mode": "driving",
+                                "key": self.key,
+                            })
+                            rows = r.json().get("rows", [])
+                        except Exception as e:
+                            logger.error(f"❌ Distance Matrix pair error: {e}")
+                            rows = []
+                        for i, origin in enumerate(block):
+                            elements = rows[i].get("elements", []) if i < len(rows) else []
+                            for n, dest in enumerate(chunk):
+                                pair = (origin["provider_id"], dest["provider_id"])
+                                el = elements[n] if n < len(elements) else {}
+                                if pair[0] == pair[1]:
+                                    continue
+                                if el.get("status") == "OK":
+                                    self._drive_minutes[pair] = round(el["duration"]["value"] / 60)
+                                elif pair not in self._drive_minutes:
+                                    self._failed_pairs[pair] = now + FAILED_PAIR_TTL_SECONDS
+            logger.info(f"📏 Cached drive times for {len(wanted)} origins in {requests} requests")
+
+        ids = {p["provider_id"] for p in points}
+        return {pair: m for pair, m in self._drive_minutes.items() if pair[0] in ids and pair[1] in ids}
+
+    @staticmethod
+    def _matrix_blocks(rows: list[tuple[dict, list[dict]]]) -> list[tuple[list[dict], list[dict]]]:
+        """
+        Group (origin, destinations needed) rows into blocks of origins sharing one
+        destination list. Blocks hold at most 25 origins — 10 once they need 10 or more
+        destinations — and an origin joins a block only if at most 10% of the block's
+        elements would be pairs already known, so a new point's full row isn't requested
+        for every old point.
+        """
+        blocks = []
+        block, union, useful = [], {}, 0
+        for origin, dests in rows:
+            merged = {**union, **{d["provider_id"]: d for d in dests}}
+            size = len(block) + 1
+            cap = min(MAX_MATRIX_SIDE, max(math.isqrt(MAX_MATRIX_ELEMENTS),
+                                           MAX_MATRIX_ELEMENTS // min(len(merged), MAX_MATRIX_SIDE)))
+            # Elements neither wanted nor an origin's distance to itself
+            diagonal = sum(o["provider_id"] in merged for o in block + [origin])
+            wasted = size * len(merged) - useful - len(dests) - diagonal
+            if block and (size > cap or wasted * 10 > size * len(merged)):
+                blocks.append((block, list(union.values())))
+                block, useful = [], 0
+                merged = {d["provider_id"]: d for d in dests}
+            block.append(origin)
+            union = merged
+            useful += len(dests)
+        if block:
+            blocks.append((block, list(union.values())))
+        return blocks
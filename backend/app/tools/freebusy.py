@@ -0,0 +1,202 @@
+"""
+Free/busy interval index — the user's existing calendar commitments as sorted,
+merged minute intervals, so "does this slot clash?" is a binary search instead
+of a Calendar API call.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the description on events CallPilot creates — lets busy lookups skip our own bookings
+CALLPILOT_MARKER = "Booked by CallPilot"
+
+
+def to_minutes(dt: datetime) -> int:
+    """Minutes since 0001-01-01 in the calendar's local time (same scale as optimizer.slot_interval)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(ZoneInfo(settings.calendar_timezone)).replace(tzinfo=None)
+    return dt.toordinal() * 1440 + dt.hour * 60 + dt.minute
+
+
+def local_now() -> datetime:
+    """Current time in the calendar's timezone — naive datetimes are read in that zone."""
+    return datetime.now(ZoneInfo(settings.calendar_timezone))
+
+
+def day_start(date_str: str) -> str:
+    """RFC3339 midnight of a YYYY-MM-DD date in the calendar's timezone, for timeMin/timeMax."""
+    return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=ZoneInfo(settings.calendar_timezone)).isoformat()
+
+
+def slot_minutes(date_str: str, time_str: str, duration_minutes: int = 60) -> tuple[int, int]:
+    """(start, end) minutes for a YYYY-MM-DD / HH:MM slot."""
+    start = to_minutes(datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M"))
+    return start, start + int(duration_minutes)
+
+
+class BusyIndex:
+    """Sorted, non-overlapping busy intervals answering overlap queries in O(log n)."""
+
+    def __init__(self, intervals: list[tuple[int, int]] = ()):
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        for start, end in sorted(intervals):
+            self._append(start, end)
+
+    def _append(self, start: int, end: int):
+        if self.ends and start <= self.ends[-1]:
+            self.ends[-1] = max(self.ends[-1], end)
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """True if [start, end) intersects any busy interval."""
+        # Last interval starting before `end`; merged intervals have increasing ends,
+        # so it is the only one that can reach past `start`.
+        i = bisect.bisect_left(self.starts, end) - 1
+        return i >= 0 and self.ends[i] > start
+
+    def free_within(self, start: int, end: int) -> list[tuple[int, int]]:
+        """Free gaps inside [start, end)."""
+        gaps, cursor = [], start
+        i = bisect.bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            if self.starts[i] > cursor:
+                gaps.append((cursor, self.starts[i]))
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def add(self, start: int, end: int):
+        """Insert a busy interval, merging with neighbours."""
+        i = bisect.bisect_left(self.starts, start)
+        # Absorb every interval that touches [start, end)
+        lo = i - 1 if i > 0 and self.ends[i - 1] >= start else i
+        hi = i
+        while hi < len(self.starts) and self.starts[hi] <= end:
+            hi += 1
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    @classmethod
+    def from_events(cls, busy: list[tuple[datetime, datetime]]) -> "BusyIndex":
+        return cls([(to_minutes(s), to_minutes(e)) for s, e in busy])
+
+
+async def load_busy_index(calendar, start_date: str, end_date: str) -> BusyIndex | None:
+    """Load the user's busy blocks for a date range with one calendar query. None if unavailable."""
+    if not calendar:
+        return None
+    try:
+        busy = await calendar.get_busy(start_date, end_date)
+    except Exception as e:
+        logger.warning(f"⚠️ Busy lookup failed, optimizing without calendar: {e}")
+        return None
+    return BusyIndex.from_events(busy)
+
+
+def format_windows(windows: list[tuple[int, int]], min_minutes: int = 30) -> str:
+    """Compact agent-readable form: 'Mon 2026-02-16 09:00-11:30, 14:00-17:00; Tue ...'."""
+    def hhmm(m: int) -> str:
+        return f"{m % 1440 // 60:02d}:{m % 60:02d}"
+
+    days: dict[int, list[str]] = {}
+    for start, end in windows:
+        if end - start >= min_minutes:
+            days.setdefault(start // 1440, []).append(f"{hhmm(start)}-{hhmm(end)}")
+    return "; ".join(
+        f"{date.fromordinal(d).strftime('%a %Y-%m-%d')} {', '.join(spans)}" for d, spans in days.items()
+    )
+
+
+class FreeBusyCache:
+    """
+    Per-user busy index over a date window. The first check for a user loads the
+    whole window with one calendar query; later checks are local bisects. Our own
+    bookings are patched in as they are created, so the window never goes stale
+    on CallPilot's side — the TTL only picks up edits the user makes elsewhere.
+    """
+
+    def __init__(self):
+        self.entries: dict[str, dict] = {}  # user_id → {"index", "start", "end", "loaded_at"}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _covers(self, entry: dict | None, date_str: str) -> bool:
+        return bool(entry) and entry["start"] <= date_str <= entry["end"] \
+            and time.monotonic() - entry["loaded_at"] < settings.freebusy_ttl_seconds
+
+    async def get_index(self, calendar, user_id: str, date_str: str) -> BusyIndex:
+        entry = self.entries.get(user_id)
+        if self._covers(entry, date_str):
+            return entry["index"]
+
+        # Single-flight: parallel calls for the same user wait on one load
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            entry = self.entries.get(user_id)
+            if self._covers(entry, date_str):
+                return entry["index"]
+            today = local_now().date()
+            start = min(today.isoformat(), date_str)
+            end = max(date_str, (today + timedelta(days=settings.freebusy_window_days)).isoformat())
+            busy = await calendar.get_busy(start, end, include_own=True)
+            index = BusyIndex.from_events(busy)
+            self.entries[user_id] = {"index": index, "start": start, "end": end, "loaded_at": time.monotonic()}
+            logger.info(f"📅 Free/busy cache loaded for {user_id}: {len(index)} blocks {start} → {end}")
+            return index
+
+    async def is_free(self, calendar, user_id: str, date_str: str, time_str: str,
+                      duration_minutes: int = 60) -> bool:
+        index = await self.get_index(calendar, user_id, date_str)
+        return not index.overlaps(*slot_minutes(date_str, time_str, duration_minutes))
+
+    async def free_windows(self, calendar, user_id: str, days: int,
+                           extra_busy: list[tuple[int, int]] = ()) -> list[tuple[int, int]]:
+        """
+        Free (start, end) minute windows within business hours over the next `days`
+        days, treating `extra_busy` (e.g. other calls' holds) as taken.
+        """
+        today = local_now()
+        last = (today.date() + timedelta(days=days - 1)).isoformat()
+        index = await self.get_index(calendar, user_id, last)
+        if extra_busy:
+            index = BusyIndex(list(zip(index.starts, index.ends)) + list(extra_busy))
+
+        # Nothing earlier than the next half hour today
+        earliest = to_minutes(today) + 30 - to_minutes(today) % 30
+        windows = []
+        for d in range(days):
+            day = (today.date() + timedelta(days=d)).toordinal() * 1440
+            start = max(day + settings.agent_day_start_hour * 60, earliest)
+            end = day + settings.agent_day_end_hour * 60
+            if start < end:
+                windows.extend(index.free_within(start, end))
+        return windows
+
+    def mark_busy(self, user_id: str, date_str: str, time_str: str, duration_minutes: int = 60):
+        """Patch a newly created event into the user's cached window (if loaded)."""
+        entry = self.entries.get(user_id)
+        if entry and entry["start"] <= date_str <= entry["end"]:
+            entry["index"].add(*slot_minutes(date_str, time_str, duration_minutes))
+
+    def invalidate(self, user_id: str):
+        self.entries.pop(user_id, None)
+
+
+freebusy_cache = FreeBusyCache()
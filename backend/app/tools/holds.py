@@ -0,0 +1,96 @@
+"""
+Tentative slot holds — an in-process reservation index so parallel calls in a
+campaign group cannot both promise the user the same time.
+
+A hold is placed when a slot passes check_calendar, released on no-availability
+or when the call ends without a booking, and is pinned to the booked slot on confirm.
+Unconfirmed holds expire after settings.slot_hold_seconds; confirmed ones after
+settings.slot_confirmed_hold_seconds, by which time the booking is in the free/busy
+cache and the synced calendar event blocks the slot instead.
+"""
+import logging
+import time
+from typing import Optional
+
+from app.config import settings
+from app.tools.freebusy import slot_minutes
+
+logger = logging.getLogger(__name__)
+
+
+class SlotHolds:
+    """user_id → {owner: hold}; owner is (campaign_id, provider_id), one hold per call."""
+
+    def __init__(self):
+        self.holds: dict[str, dict[tuple, dict]] = {}
+
+    def _active(self, user_id: str) -> dict[tuple, dict]:
+        now = time.monotonic()
+        user_holds = self.holds.get(user_id, {})
+        for owner in [o for o, h in user_holds.items() if h["expires"] <= now]:
+            logger.info(f"⏳ Slot hold expired: {owner}")
+            del user_holds[owner]
+        if not user_holds:
+            self.holds.pop(user_id, None)
+        return user_holds
+
+    def conflict(self, user_id: str, owner: tuple, date_str: str, time_str: str,
+                 duration_minutes: int = 60) -> Optional[dict]:
+        """The hold another call has on an overlapping slot, if any."""
+        start, end = slot_minutes(date_str, time_str, duration_minutes)
+        for other, h in self._active(user_id).items():
+            if other != owner and h["start"] < end and start < h["end"]:
+                return h
+        return None
+
+    def intervals(self, user_id: str, exclude: tuple = None) -> list[tuple[int, int]]:
+        """(start, end) minutes of every active hold, optionally skipping one call's own."""
+        return [(h["start"], h["end"]) for o, h in self._active(user_id).items() if o != exclude]
+
+    def hold(self, user_id: str, owner: tuple, date_str: str, time_str: str,
+             duration_minutes: int = 60) -> tuple[Optional[dict], Optional[dict]]:
+        """
+        Place (or move) this call's tentative hold. Confirmed holds are never moved.
+        Returns (placed, previous) for revert(); placed is None if nothing changed.
+        """
+        user_holds = self._active(user_id)
+        previous = user_holds.get(owner)
+        if previous and previous["confirmed"]:
+            return None, previous
+        start, end = slot_minutes(date_str, time_str, duration_minutes)
+        placed = user_holds[owner] = {
+            "campaign_id": owner[0], "provider_id": owner[1], "date": date_str, "time": time_str,
+            "start": start, "end": end, "expires": time.monotonic() + settings.slot_hold_seconds,
+            "confirmed": False,
+        }
+        self.holds[user_id] = user_holds
+        return placed, previous
+
+    def revert(self, user_id: str, owner: tuple, placed: Optional[dict], previous: Optional[dict]):
+        """
+        Undo one hold() — put back the hold this call had before it, if any. A no-op if
+        the call's hold has been replaced since, so only the caller's own hold is dropped.
+        """
+        user_holds = self.holds.get(user_id, {})
+        if placed is None or user_holds.get(owner) is not placed:
+            return
+        if previous is not None and previous["expires"] > time.monotonic():
+            user_holds[owner] = previous
+        else:
+            del user_holds[owner]
+
+    def confirm(self, user_id: str, owner: tuple, date_str: str, time_str: str, duration_minutes: int = 60):
+        """Pin this call's hold to the booked slot until the booking reaches the calendar."""
+        self.hold(user_id, owner, date_str, time_str, duration_minutes)
+        h = self.holds[user_id][owner]
+        h["confirmed"] = True
+        h["expires"] = time.monotonic() + settings.slot_confirmed_hold_seconds
+
+    def release(self, user_id: str, owner: tuple):
+        """Drop this call's hold unless it was confirmed."""
+        h = self.holds.get(user_id, {}).get(owner)
+        if h and not h["confirmed"]:
+            del self.holds[user_id][owner]
+
+
+slot_holds = SlotHolds()
@@ -0,0 +1,103 @@
+"""
+Benchmark: branch-and-bound optimizer vs. brute-force Cartesian product.
+Run from backend/:  python bench_optimizer.py
+Checks both return the same optimum and prints the speedup.
+"""
+import random
+import time
+from itertools import product
+
+from app.scoring import optimizer
+from app.scoring.optimizer import optimize_appointments, parse_slot, slots_conflict, haversine_miles
+
+
+def brute_force(options_per_campaign):
+    """Exhaustive reference search with the same objective, built on the scalar helpers."""
+    best_combo, best_total_score = None, -1
+    for combo in product(*options_per_campaign):
+        if any(c["provider_id"] is None for c in combo):
+            continue
+        visits = sorted(combo, key=lambda c: parse_slot(c["slot"])[0])
+        feasible = True
+        for i in range(len(visits)):
+            for j in range(i + 1, len(visits)):
+                a, b = visits[i], visits[j]
+                if slots_conflict(a["slot"], b["slot"]):
+                    feasible = False
+                    break
+                gap = (parse_slot(b["slot"])[0] - parse_slot(a["slot"])[1]).total_seconds() / 60
+                drive = haversine_miles(a["lat"], a["lng"], b["lat"], b["lng"]) / optimizer.FALLBACK_MPH * 60
+                if gap < drive:
+                    feasible = False
+                    break
+            if not feasible:
+                break
+        if not feasible:
+            continue
+        total_score = sum(c["score"] for c in combo)
+        total_travel = 0
+        for i in range(len(visits) - 1):
+            total_travel += haversine_miles(visits[i]["lat"], visits[i]["lng"], visits[i+1]["lat"], visits[i+1]["lng"])
+        if total_travel > 0:
+            total_score += max(0, 0.2 * (1 - total_travel / 30))
+        if total_score > best_total_score:
+            best_total_score, best_combo = total_score, combo
+    return best_combo, best_total_score
+
+
+def make_group(service_types: int, providers_per_type: int, days: int = 5, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    campaigns = []
+    for s in range(service_types):
+        providers, results = [], []
+        for p in range(providers_per_type):
+            pid = f"s{s}p{p}"
+            providers.append({"provider_id": pid, "lat": 42.36 + rng.uniform(-0.1, 0.1),
+                              "lng": -71.06 + rng.uniform(-0.1, 0.1), "distance_miles": rng.uniform(0, 10)})
+            results.append({
+                "provider_id": pid, "provider_name": pid, "status": "booked",
+                "score": round(rng.uniform(0.3, 1.0), 3),
+                "offered_slot": {"date": f"2026-03-{10 + rng.randrange(days):02d}",
+                                 "time": f"{rng.randint(8, 17):02d}:{rng.choice(['00', '15', '30', '45'])}"},
+            })
+        campaigns.append({"campaign_id": f"c{s}", "service_type": f"svc{s}", "status": "completed",
+                          "providers": providers, "results": results})
+    return {"group_id": "bench", "campaigns": campaigns}
+
+
+def options_for(group: dict) -> list[list[dict]]:
+    """Same option lists optimize_appointments builds (all results in make_group are booked)."""
+    out = []
+    for camp in group["campaigns"]:
+        provs = {p["provider_id"]: p for p in camp["providers"]}
+        out.append([{
+            "service_type": camp["service_type"], "provider_id": r["provider_id"],
+            "provider_name": r["provider_name"], "slot": r["offered_slot"], "score": r["score"],
+            "lat": provs[r["provider_id"]]["lat"], "lng": provs[r["provider_id"]]["lng"],
+            "distance_miles": provs[r["provider_id"]]["distance_miles"],
+        } for r in camp["results"]])
+    return out
+
+
+if __name__ == "__main__":
+    optimizer.logger.disabled = True
+    print(f"{'types':>5} {'opts':>4} {'combos':>9} {'brute (ms)':>11} {'b&b (ms)':>9} {'speedup':>8}")
+    for types, per_type in [(3, 5), (4, 5), (5, 5), (6, 5), (6, 6), (7, 5)]:
+        group = make_group(types, per_type, seed=types * 100 + per_type)
+
+        t0 = time.perf_counter()
+        ref_combo, ref_score = brute_force(options_for(group))
+        brute_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        result = optimize_appointments(group)
+        bnb_ms = (time.perf_counter() - t0) * 1000
+
+        if ref_combo is None:
+            assert not result["optimized"], "brute force found no plan but optimizer did"
+        else:
+            assert round(ref_score, 3) == result["total_score"], (ref_score, result["total_score"])
+            assert {c["provider_id"] for c in ref_combo} == {a["provider_id"] for a in result["appointments"]}
+
+        print(f"{types:>5} {per_type:>4} {per_type ** types:>9} {brute_ms:>11.1f} {bnb_ms:>9.1f} "
+              f"{brute_ms / max(bnb_ms, 1e-6):>7.1f}x")
@@ -0,0 +1,87 @@
+"""
+Benchmark: WebSocket wire size and CPU per campaign for each frame mode.
+Run from backend/:  python bench_ws.py
+Replays a synthetic campaign's event stream (incremental transcript updates, then
+transcript_final / call_ended / transcript_loaded carrying the full transcript)
+through the same encoders the server uses. Deflate is modelled like
+permessage-deflate with context takeover: one raw-deflate stream per connection,
+sync-flushed per message, trailing 00 00 ff ff stripped.
+"""
+import random
+import time
+import zlib
+
+from app.encoding import FrozenJSON, dumps_str, json_to_msgpack
+
+PHRASES = [
+    "Hi, I'm calling to book an appointment for a cleaning.",
+    "Sure, what day works best for you?",
+    "Do you have anything open Tuesday afternoon?",
+    "We have 2:30 or 4:00 PM available on Tuesday.",
+    "2:30 works. Do you take Delta Dental insurance?",
+    "Yes, we're in network with Delta Dental.",
+    "Great, please book the 2:30 slot under Jordan Smith.",
+    "You're all set for Tuesday at 2:30. Anything else?",
+]
+
+
+def campaign_events(providers: int = 15, turns: int = 30, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    events = []
+    for p in range(providers):
+        pid, cid = f"prov_{p}", f"camp_{p % 3}"
+        events.append({"type": "call_started", "campaign_id": cid, "provider_id": pid, "provider_name": f"Clinic {p}"})
+        transcript = []
+        for t in range(turns):
+            entry = {"role": "agent" if t % 2 == 0 else "user", "message": rng.choice(PHRASES), "time": t * 6}
+            transcript.append(entry)
+            events.append({
+                "type": "transcript_update", "campaign_id": cid, "provider_id": pid,
+                "new_entries": [entry], "total_entries": len(transcript),
+            })
+        final = FrozenJSON(transcript)
+        for kind in ("transcript_final", "call_ended", "transcript_loaded"):
+            events.append({"type": kind, "campaign_id": cid, "provider_id": pid, "transcript": final})
+    return [{**e, "seq": i + 1} for i, e in enumerate(events)]
+
+
+def deflater():
+    stream = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def compress(data: bytes) -> bytes:
+        return (stream.compress(data) + stream.flush(zlib.Z_SYNC_FLUSH))[:-4]
+    return compress
+
+
+def run(events: list[dict], binary: bool, deflate: bool) -> tuple[int, float]:
+    compress = deflater() if deflate else None
+    total = 0
+    start = time.process_time()
+    for event in events:
+        frame = dumps_str(event)  # What broadcast() does once per event
+        payload = json_to_msgpack(frame) if binary else frame.encode()
+        if compress:
+            payload = compress(payload)
+        total += len(payload)
+    return total, time.process_time() - start
+
+
+def main():
+    events = campaign_events()
+    repeats = 20
+    print(f"{len(events)} events per campaign, CPU averaged over {repeats} runs\n")
+    print(f"{'mode':<18}{'bytes':>10}{'ratio':>8}{'CPU ms':>10}")
+    baseline = None
+    for name, binary, deflate in [
+        ("json", False, False), ("json+deflate", False, True),
+        ("msgpack", True, False), ("msgpack+deflate", True, True),
+    ]:
+        results = [run(events, binary, deflate) for _ in range(repeats)]
+        size = results[0][0]
+        cpu = sum(r[1] for r in results) / repeats
+        baseline = baseline or size
+        print(f"{name:<18}{size:>10}{size / baseline:>8.2f}{cpu * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ CREATE TABLE users (
     avatar_url TEXT,
     google_access_token TEXT,
     google_refresh_token TEXT,
+    google_token_expires_at TIMESTAMPTZ,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
@@ -213,3 +214,10 @@ CREATE TRIGGER update_providers_updated_at
 CREATE TRIGGER update_bookings_updated_at
     BEFORE UPDATE ON bookings
     FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+
+-- ============================================
+-- MIGRATIONS
+-- For databases created from an earlier version of this file
+-- ============================================
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS google_token_expires_at TIMESTAMPTZ;
@@ -0,0 +1,80 @@
+"""
+Reconnect sequence for /ws/transcript/{room_id}: a client connecting with ?since= gets
+the campaign snapshot plus the events it missed, without the campaign patches that
+snapshot already contains.
+
+Run from backend/:  python test_ws_reconnect.py  (or pytest test_ws_reconnect.py)
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import ws
+
+ROOM = "reconnect-test"
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(ws.router)
+
+    @app.post("/events")
+    async def events():
+        await ws.broadcast_campaign(ROOM, {"a": [1]})  # v1 snapshot
+        await ws.broadcast(ROOM, {"type": "call_started", "provider_id": "p1"})
+        await ws.broadcast_campaign(ROOM, {"a": [1, 2]})  # v2 patch: add /a/1
+        return {}
+
+    return app
+
+
+def _apply(state: dict, ops: list[dict]) -> dict:
+    """Enough of RFC 6902 for this test: add/replace/remove on list and dict paths."""
+    for op in ops:
+        *parents, last = op["path"].lstrip("/").split("/")
+        target = state
+        for key in parents:
+            target = target[int(key)] if isinstance(target, list) else target[key]
+        if isinstance(target, list):
+            if op["op"] == "add":
+                target.insert(int(last), op["value"])
+            elif op["op"] == "replace":
+                target[int(last)] = op["value"]
+            else:
+                del target[int(last)]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return state
+
+
+def _receive(socket) -> list[dict]:
+    data = socket.receive_json()
+    return data["messages"] if data.get("type") == "batch" else [data]
+
+
+def test_reconnect_skips_patches_in_snapshot():
+    client = TestClient(_app())
+    with client:
+        client.post("/events")
+        with client.websocket_connect(f"/ws/transcript/{ROOM}?since=0") as socket:
+            snapshot = socket.receive_json()
+            assert snapshot["type"] == "campaign_update" and snapshot["version"] == 2
+            state = snapshot["campaign"]
+
+            replayed = _receive(socket)
+            assert [m["type"] for m in replayed] == ["call_started"]
+
+            # An explicit resume must not re-send the patch either
+            socket.send_json({"type": "resume", "since": 0})
+            replayed += _receive(socket)
+            for message in replayed:
+                if message["type"] == "campaign_patch":
+                    state = _apply(state, message["ops"])
+            assert state == {"a": [1, 2]}
+            assert all(m["type"] != "campaign_patch" for m in replayed)
+
+
+if __name__ == "__main__":
+    test_reconnect_skips_patches_in_snapshot()
+    print("✅ Reconnect replay skips patches already in the snapshot")
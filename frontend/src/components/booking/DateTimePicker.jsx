@@ -189,10 +189,10 @@ export default function DateTimePicker() {
                                         <div className="w-1.5 h-full min-h-[1.5rem] rounded-full bg-primary/50 self-stretch" />
                                         <div className="flex-1 min-w-0">
                                             <p className="text-sm font-medium text-gray-900 truncate">
-                                                {event.title}
+                                                {event.summary}
                                             </p>
                                             <p className="text-xs text-gray-500">
-                                                {event.allDay
+                                                {event.all_day
                                                     ? new Date(event.start).toLocaleDateString()
                                                     : `${new Date(event.start).toLocaleString([], {
                                                         month: 'short', day: 'numeric', hour: 'numeric', minute: '2-digit'
@@ -4,38 +4,70 @@ const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000'
 
 export function useWebSocket(roomId, onMessage) {
   const wsRef = useRef(null)
+  // Last event sequence number seen — sent on (re)connect so the server replays only what we missed
+  const lastSeqRef = useRef(0)
+  // Which numbering lastSeq belongs to — a restarted server starts a new epoch at seq 1
+  const epochRef = useRef(null)
 
   useEffect(() => {
     if (!roomId) return
 
-    const url = `${WS_URL}/ws/transcript/${roomId}`
-    console.log('📡 Connecting WS:', url)
+    let closed = false
+    let retryTimer = null
+    lastSeqRef.current = 0
+    epochRef.current = null
 
-    const ws = new WebSocket(url)
-    wsRef.current = ws
+    const connect = () => {
+      const epoch = epochRef.current ? `&epoch=${epochRef.current}` : ''
+      const url = `${WS_URL}/ws/transcript/${roomId}?since=${lastSeqRef.current}${epoch}`
+      console.log('📡 Connecting WS:', url)
 
-    ws.onopen = () => console.log('📡 WS connected')
-    ws.onmessage = (e) => {
-      try {
-        const data = JSON.parse(e.data)
-        console.log('📡 WS message:', data)
-        onMessage(data)
-      } catch (err) {
-        console.error('WS parse error:', err)
-      }
-    }
-    ws.onerror = (e) => console.error('📡 WS error:', e)
-    ws.onclose = () => {
-      console.log('📡 WS disconnected, reconnecting in 3s...')
-      setTimeout(() => {
-        if (wsRef.current?.readyState === WebSocket.CLOSED) {
-          // Reconnect logic would go here
+      const ws = new WebSocket(url)
+      wsRef.current = ws
+
+      ws.onopen = () => console.log('📡 WS connected')
+      ws.onmessage = (e) => {
+        try {
+          const data = JSON.parse(e.data)
+          // Server heartbeat — answer it or the server closes the socket as dead
+          if (data.type === 'ping') {
+            ws.send(JSON.stringify({ type: 'pong' }))
+            return
+          }
+          console.log('📡 WS message:', data)
+          // The server coalesces bursts into one frame; replay them in order
+          const messages = data.type === 'batch' ? data.messages : [data]
+          messages.forEach((msg) => {
+            if (msg.epoch && msg.epoch !== epochRef.current) {
+              epochRef.current = msg.epoch
+              lastSeqRef.current = 0
+            }
+            if (msg.type === 'snapshot') {
+              lastSeqRef.current = msg.seq  // Replaces everything up to seq, whatever we had
+            } else if (msg.seq != null) {
+              if (msg.seq <= lastSeqRef.current) return  // Already applied (replay overlap)
+              lastSeqRef.current = msg.seq
+            }
+            onMessage(msg)
+          })
+        } catch (err) {
+          console.error('WS parse error:', err)
         }
-      }, 3000)
+      }
+      ws.onerror = (e) => console.error('📡 WS error:', e)
+      ws.onclose = () => {
+        if (closed) return
+        console.log('📡 WS disconnected, reconnecting in 3s...')
+        retryTimer = setTimeout(connect, 3000)
+      }
     }
 
+    connect()
+
     return () => {
-      ws.close()
+      closed = true
+      clearTimeout(retryTimer)
+      wsRef.current?.close()
       wsRef.current = null
     }
   }, [roomId])
@@ -262,6 +262,35 @@ export const useCampaignStore = create((set, get) => ({
       case 'campaign_error':
         set({ status: 'error', message: msg.error })
         break
+
+      case 'snapshot': {
+        // Sent on reconnect when we missed more than the server's replay buffer holds
+        const campaigns = {}
+        const calls = {}
+        msg.group.campaigns.forEach(c => {
+          campaigns[c.campaign_id] = {
+            ...s.campaigns[c.campaign_id],
+            service_type: c.service_type, status: c.status,
+            providers: c.providers, results: c.results, bestMatch: c.best_match,
+          }
+          c.providers.forEach(p => {
+            calls[p.provider_id] = {
+              status: 'queued', ...s.calls[p.provider_id],
+              name: p.name, rating: p.rating, distance: p.distance_miles,
+              photo: p.photo_url, lat: p.lat, lng: p.lng, campaignId: c.campaign_id,
+            }
+          })
+          c.results.forEach(r => {
+            calls[r.provider_id] = {
+              ...calls[r.provider_id],
+              status: r.status,
+              ...(r.offered_slot && { slot: r.offered_slot }),
+            }
+          })
+        })
+        set({ status: msg.group.status === 'running' ? 'calling' : msg.group.status, campaigns, calls })
+        break
+      }
     }
   },
 }))
\ No newline at end of file